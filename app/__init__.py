@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
+from .database import load_database_config, apply_sqlite_pragmas
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -11,16 +12,21 @@ csrf = CSRFProtect()
 
 @login_manager.user_loader
 def load_user(user_id):
-    from .models import Student
-    return Student.query.get(int(user_id))
+    from .identity import load_student
+    return load_student(int(user_id))
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'your-secret-key'
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///library.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    load_database_config(app)
+    if config:
+        app.config.update(config)
 
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
     migrate.init_app(app, db)
     login_manager.init_app(app)
     csrf.init_app(app)
@@ -28,7 +34,25 @@ def create_app():
 
     from . import routes
     from . import api
+    from . import metrics
+    from . import profiling
+    from . import compression
+    from . import assets
     app.register_blueprint(routes.bp)
     app.register_blueprint(api.api_bp)
+    app.register_blueprint(metrics.metrics_bp)
+    app.register_blueprint(assets.assets_bp)
+    metrics.init_app(app)
+    profiling.init_app(app)
+    compression.init_app(app)
+    assets.init_app(app)
+
+    from .catalog import catalog_cli
+    from .rollups import rollups_cli
+    from .recommendations import recommendations_cli
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(assets.assets_cli)
 
     return app
\ No newline at end of file
@@ -1,20 +1,28 @@
 from flask import Blueprint, jsonify, request
 from functools import wraps
-from . import db
+from . import db, circulation, availability, rollups
 from .models import Book, Student, Borrowing
-from datetime import datetime
+from .pagination import get_page_args, keyset_paginate
+from .serializers import BOOK, STUDENT, BORROWING, InvalidFields
+from .exports import wants_ndjson, ndjson_response
+from .search import search_books
+from .catalog import import_openlibrary_books
+from .versioning import conditional
+from .statistics import get_statistics as library_statistics
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 
 @api_bp.route('/books', methods=['GET'])
+@conditional('book')
 def get_books():
-    """Get all books with optional filtering"""
+    """Get a page of books with optional filtering, or stream them all as NDJSON"""
     try:
+        limit, after = get_page_args()
         available_only = request.args.get('available_only', 'false').lower() == 'true'
         genre = request.args.get('genre')
         
-        query = Book.query
+        query = BOOK.query(BOOK.requested_fields())
         
         if available_only:
             query = query.filter(Book.available_quantity > 0)
@@ -22,48 +30,62 @@ def get_books():
         if genre:
             query = query.filter(Book.genre == genre)
         
-        books = query.all()
+        if wants_ndjson():
+            return ndjson_response(BOOK.iter_dump(query, after))
         
+        books, next_cursor = keyset_paginate(query, Book.id, limit, after)
+        
+        return jsonify({
+            'success': True,
+            'count': len(books),
+            'next_cursor': next_cursor,
+            'books': [BOOK.dump(book) for book in books]
+        }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/books/search', methods=['GET'])
+@conditional('book')
+def search_catalog():
+    """Full-text search over title, author, genre and ISBN, best matches first"""
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Missing required query parameter: q'}), 400
+
+        limit, _ = get_page_args()
+        available_only = request.args.get('available_only', 'false').lower() == 'true'
+        books = search_books(q, available_only=available_only, limit=limit,
+                             query=BOOK.query(BOOK.requested_fields()))
+
         return jsonify({
             'success': True,
             'count': len(books),
-            'books': [
-                {
-                    'id': book.id,
-                    'isbn': book.isbn,
-                    'title': book.title,
-                    'author': book.author,
-                    'genre': book.genre,
-                    'quantity': book.quantity,
-                    'available_quantity': book.available_quantity
-                }
-                for book in books
-            ]
+            'books': [BOOK.dump(book) for book in books]
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/books/<int:book_id>', methods=['GET'])
+@conditional('book')
 def get_book(book_id):
     """Get a specific book by ID"""
     try:
-        book = Book.query.get(book_id)
+        book = BOOK.get(book_id, BOOK.requested_fields())
         
         if not book:
             return jsonify({'error': 'Book not found'}), 404
         
         return jsonify({
             'success': True,
-            'book': {
-                'id': book.id,
-                'isbn': book.isbn,
-                'title': book.title,
-                'author': book.author,
-                'genre': book.genre,
-                'quantity': book.quantity,
-                'available_quantity': book.available_quantity
-            }
+            'book': book
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -98,20 +120,47 @@ def create_book():
         return jsonify({
             'success': True,
             'message': 'Book created successfully',
-            'book': {
-                'id': book.id,
-                'isbn': book.isbn,
-                'title': book.title,
-                'author': book.author,
-                'genre': book.genre,
-                'quantity': book.quantity,
-                'available_quantity': book.available_quantity
-            }
+            'book': BOOK.get(book.id)
         }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+MAX_IMPORT_KEYS = 50
+
+@api_bp.route('/books/import', methods=['POST'])
+def import_books():
+    """Import many Open Library works or editions, resolving them concurrently"""
+    try:
+        data = request.get_json()
+        keys = data.get('keys') if isinstance(data, dict) else None
+        
+        if not isinstance(keys, list) or not keys or not all(isinstance(k, str) for k in keys):
+            return jsonify({'error': 'Missing required field: keys'}), 400
+        if len(keys) > MAX_IMPORT_KEYS:
+            return jsonify({'error': f'At most {MAX_IMPORT_KEYS} keys can be imported at once'}), 400
+        
+        imported_books = import_openlibrary_books(keys)
+        books = BOOK.get_many([r.id for r in imported_books if isinstance(r, Book)])
+        
+        results = []
+        for key, result in zip(keys, imported_books):
+            if isinstance(result, Book):
+                results.append({'key': key, 'success': True, 'book': books[result.id]})
+            else:
+                results.append({'key': key, 'success': False, 'error': str(result)})
+        
+        imported = sum(1 for r in results if r['success'])
+        return jsonify({
+            'success': True,
+            'imported': imported,
+            'failed': len(results) - imported,
+            'results': results
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/books/<int:book_id>', methods=['PUT'])
 def update_book(book_id):
     """Update a book"""
@@ -139,15 +188,7 @@ def update_book(book_id):
         return jsonify({
             'success': True,
             'message': 'Book updated successfully',
-            'book': {
-                'id': book.id,
-                'isbn': book.isbn,
-                'title': book.title,
-                'author': book.author,
-                'genre': book.genre,
-                'quantity': book.quantity,
-                'available_quantity': book.available_quantity
-            }
+            'book': BOOK.get(book.id)
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -186,26 +227,24 @@ def delete_book(book_id):
 
 @api_bp.route('/students', methods=['GET'])
 def get_students():
-    """Get all students"""
+    """Get a page of students, or stream them all as NDJSON"""
     try:
-        students = Student.query.all()
+        limit, after = get_page_args()
+        query = STUDENT.query(STUDENT.requested_fields())
+        
+        if wants_ndjson():
+            return ndjson_response(STUDENT.iter_dump(query, after))
+        
+        students, next_cursor = keyset_paginate(query, Student.id, limit, after)
         
         return jsonify({
             'success': True,
             'count': len(students),
-            'students': [
-                {
-                    'id': student.id,
-                    'email': student.email,
-                    'full_name': student.full_name,
-                    'class_name': student.class_name,
-                    'school': student.school,
-                    'contact': student.contact,
-                    'is_admin': student.is_admin
-                }
-                for student in students
-            ]
+            'next_cursor': next_cursor,
+            'students': [STUDENT.dump(student) for student in students]
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -213,23 +252,17 @@ def get_students():
 def get_student(student_id):
     """Get a specific student by ID"""
     try:
-        student = Student.query.get(student_id)
+        student = STUDENT.get(student_id, STUDENT.requested_fields())
         
         if not student:
             return jsonify({'error': 'Student not found'}), 404
         
         return jsonify({
             'success': True,
-            'student': {
-                'id': student.id,
-                'email': student.email,
-                'full_name': student.full_name,
-                'class_name': student.class_name,
-                'school': student.school,
-                'contact': student.contact,
-                'is_admin': student.is_admin
-            }
+            'student': student
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -263,15 +296,7 @@ def create_student():
         return jsonify({
             'success': True,
             'message': 'Student created successfully',
-            'student': {
-                'id': student.id,
-                'email': student.email,
-                'full_name': student.full_name,
-                'class_name': student.class_name,
-                'school': student.school,
-                'contact': student.contact,
-                'is_admin': student.is_admin
-            }
+            'student': STUDENT.get(student.id)
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -293,7 +318,7 @@ def update_student(student_id):
         if 'class_name' in data:
             student.class_name = data['class_name']
         if 'school' in data:
-            student.school = data['school']
+            rollups.change_school(student, data['school'])
         if 'contact' in data:
             student.contact = data['contact']
         
@@ -302,15 +327,7 @@ def update_student(student_id):
         return jsonify({
             'success': True,
             'message': 'Student updated successfully',
-            'student': {
-                'id': student.id,
-                'email': student.email,
-                'full_name': student.full_name,
-                'class_name': student.class_name,
-                'school': student.school,
-                'contact': student.contact,
-                'is_admin': student.is_admin
-            }
+            'student': STUDENT.get(student.id)
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -350,13 +367,14 @@ def delete_student(student_id):
 
 @api_bp.route('/borrowings', methods=['GET'])
 def get_borrowings():
-    """Get all borrowings with optional filtering"""
+    """Get a page of borrowings with optional filtering, or stream them all as NDJSON"""
     try:
+        limit, after = get_page_args()
         status = request.args.get('status')
         student_id = request.args.get('student_id', type=int)
         book_id = request.args.get('book_id', type=int)
         
-        query = Borrowing.query
+        query = BORROWING.query(BORROWING.requested_fields())
         
         if status:
             query = query.filter(Borrowing.status == status)
@@ -365,26 +383,19 @@ def get_borrowings():
         if book_id:
             query = query.filter(Borrowing.book_id == book_id)
         
-        borrowings = query.all()
+        if wants_ndjson():
+            return ndjson_response(BORROWING.iter_dump(query, after))
+        
+        borrowings, next_cursor = keyset_paginate(query, Borrowing.id, limit, after)
         
         return jsonify({
             'success': True,
             'count': len(borrowings),
-            'borrowings': [
-                {
-                    'id': borrowing.id,
-                    'student_id': borrowing.student_id,
-                    'student_name': borrowing.student.full_name,
-                    'book_id': borrowing.book_id,
-                    'book_title': borrowing.book.title,
-                    'borrow_date': borrowing.borrow_date.isoformat(),
-                    'due_date': borrowing.due_date.isoformat() if borrowing.due_date else None,
-                    'return_date': borrowing.return_date.isoformat() if borrowing.return_date else None,
-                    'status': borrowing.status
-                }
-                for borrowing in borrowings
-            ]
+            'next_cursor': next_cursor,
+            'borrowings': [BORROWING.dump(borrowing) for borrowing in borrowings]
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -392,25 +403,17 @@ def get_borrowings():
 def get_borrowing(borrowing_id):
     """Get a specific borrowing by ID"""
     try:
-        borrowing = Borrowing.query.get(borrowing_id)
+        borrowing = BORROWING.get(borrowing_id, BORROWING.requested_fields())
         
         if not borrowing:
             return jsonify({'error': 'Borrowing record not found'}), 404
         
         return jsonify({
             'success': True,
-            'borrowing': {
-                'id': borrowing.id,
-                'student_id': borrowing.student_id,
-                'student_name': borrowing.student.full_name,
-                'book_id': borrowing.book_id,
-                'book_title': borrowing.book.title,
-                'borrow_date': borrowing.borrow_date.isoformat(),
-                'due_date': borrowing.due_date.isoformat() if borrowing.due_date else None,
-                'return_date': borrowing.return_date.isoformat() if borrowing.return_date else None,
-                'status': borrowing.status
-            }
+            'borrowing': borrowing
         }), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -431,37 +434,101 @@ def create_borrowing():
         if not book:
             return jsonify({'error': 'Book not found'}), 404
         
-        if book.available_quantity <= 0:
-            return jsonify({'error': 'No copies available for this book'}), 409
-        
-        borrowing = Borrowing(
-            student_id=data['student_id'],
-            book_id=data['book_id']
-        )
-        
-        book.available_quantity -= 1
-        db.session.add(borrowing)
-        db.session.commit()
+        try:
+            borrowing = circulation.borrow_book(student.id, book.id)
+        except circulation.BookUnavailable as e:
+            return jsonify({'error': str(e)}), 409
         
         return jsonify({
             'success': True,
             'message': 'Borrowing record created successfully',
-            'borrowing': {
-                'id': borrowing.id,
-                'student_id': borrowing.student_id,
-                'student_name': borrowing.student.full_name,
-                'book_id': borrowing.book_id,
-                'book_title': borrowing.book.title,
-                'borrow_date': borrowing.borrow_date.isoformat(),
-                'due_date': borrowing.due_date.isoformat() if borrowing.due_date else None,
-                'return_date': borrowing.return_date.isoformat() if borrowing.return_date else None,
-                'status': borrowing.status
-            }
+            'borrowing': BORROWING.get(borrowing.id)
         }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+MAX_BATCH_SIZE = 200
+
+def _batch_id(value):
+    """An id from a batch payload: a positive integer or a string of digits, otherwise None"""
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return value
+    return None
+
+def _batch_results(results):
+    """Per-item JSON results for a batch borrow or return"""
+    borrowings = BORROWING.get_many([r.id for r in results if isinstance(r, Borrowing)])
+    items = []
+    for index, result in enumerate(results):
+        if isinstance(result, circulation.CirculationError):
+            items.append({'index': index, 'success': False, 'error': str(result)})
+        else:
+            items.append({'index': index, 'success': True, 'borrowing': borrowings[result.id]})
+    succeeded = sum(1 for item in items if item['success'])
+    return {
+        'success': True,
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'results': items
+    }
+
+@api_bp.route('/borrowings/batch', methods=['POST'])
+def create_borrowings_batch():
+    """Create many borrowing records in one transaction"""
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else None
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Missing required field: items'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'A batch may contain at most {MAX_BATCH_SIZE} items'}), 400
+        
+        pairs = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or 'student_id' not in item or 'book_id' not in item:
+                return jsonify({'error': f'Item {index} is missing student_id or book_id'}), 400
+            student_id, book_id = _batch_id(item['student_id']), _batch_id(item['book_id'])
+            if student_id is None or book_id is None:
+                return jsonify({'error': f'Item {index} has an invalid student_id or book_id'}), 400
+            pairs.append((student_id, book_id))
+        
+        results = circulation.borrow_batch(pairs)
+        
+        return jsonify(_batch_results(results)), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/borrowings/returns/batch', methods=['POST'])
+def return_books_batch():
+    """Mark many borrowings as returned in one transaction"""
+    try:
+        data = request.get_json(silent=True)
+        borrowing_ids = data.get('borrowing_ids') if isinstance(data, dict) else None
+        
+        if not isinstance(borrowing_ids, list) or not borrowing_ids:
+            return jsonify({'error': 'Missing required field: borrowing_ids'}), 400
+        if len(borrowing_ids) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'A batch may contain at most {MAX_BATCH_SIZE} items'}), 400
+        
+        ids = []
+        for index, borrowing_id in enumerate(borrowing_ids):
+            borrowing_id = _batch_id(borrowing_id)
+            if borrowing_id is None:
+                return jsonify({'error': f'Item {index} is not a valid borrowing id'}), 400
+            ids.append(borrowing_id)
+        
+        results = circulation.return_batch(ids)
+        
+        return jsonify(_batch_results(results)), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/borrowings/<int:borrowing_id>/return', methods=['POST'])
 def return_book(borrowing_id):
     """Mark a book as returned"""
@@ -471,29 +538,15 @@ def return_book(borrowing_id):
         if not borrowing:
             return jsonify({'error': 'Borrowing record not found'}), 404
         
-        if borrowing.status == 'returned':
-            return jsonify({'error': 'Book has already been returned'}), 409
-        
-        borrowing.status = 'returned'
-        borrowing.return_date = datetime.utcnow()
-        borrowing.book.available_quantity += 1
-        
-        db.session.commit()
+        try:
+            circulation.return_book(borrowing)
+        except circulation.AlreadyReturned as e:
+            return jsonify({'error': str(e)}), 409
         
         return jsonify({
             'success': True,
             'message': 'Book returned successfully',
-            'borrowing': {
-                'id': borrowing.id,
-                'student_id': borrowing.student_id,
-                'student_name': borrowing.student.full_name,
-                'book_id': borrowing.book_id,
-                'book_title': borrowing.book.title,
-                'borrow_date': borrowing.borrow_date.isoformat(),
-                'due_date': borrowing.due_date.isoformat() if borrowing.due_date else None,
-                'return_date': borrowing.return_date.isoformat() if borrowing.return_date else None,
-                'status': borrowing.status
-            }
+            'borrowing': BORROWING.get(borrowing.id)
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -508,11 +561,7 @@ def delete_borrowing(borrowing_id):
         if not borrowing:
             return jsonify({'error': 'Borrowing record not found'}), 404
         
-        if borrowing.status == 'borrowed':
-            borrowing.book.available_quantity += 1
-        
-        db.session.delete(borrowing)
-        db.session.commit()
+        circulation.delete_borrowing(borrowing)
         
         return jsonify({
             'success': True,
@@ -522,29 +571,27 @@ def delete_borrowing(borrowing_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/stream/availability', methods=['GET'])
+def availability_stream():
+    """Server-Sent Events of {book_id, available_quantity} whenever a borrow, return or edit changes stock"""
+    return availability.event_stream()
+
 @api_bp.route('/statistics', methods=['GET'])
+@conditional('book', 'student', 'borrowing', refresh_seconds=60)
 def get_statistics():
     """Get library statistics"""
     try:
-        total_books = Book.query.count()
-        total_copies = sum(book.quantity for book in Book.query.all()) or 0
-        available_books = Book.query.filter(Book.available_quantity > 0).count()
-        total_students = Student.query.count()
-        active_borrowings = Borrowing.query.filter(Borrowing.status == 'borrowed').count()
-        overdue_books = Borrowing.query.filter(
-            Borrowing.status == 'borrowed',
-            Borrowing.due_date < datetime.utcnow()
-        ).count()
+        stats = library_statistics()
         
         return jsonify({
             'success': True,
             'statistics': {
-                'total_books': total_books,
-                'total_copies': total_copies,
-                'available_books': available_books,
-                'total_students': total_students,
-                'active_borrowings': active_borrowings,
-                'overdue_books': overdue_books
+                'total_books': stats['total_books'],
+                'total_copies': stats['total_copies'],
+                'available_books': stats['available_books'],
+                'total_students': stats['total_students'],
+                'active_borrowings': stats['active_borrowings'],
+                'overdue_books': stats['overdue_books']
             }
         }), 200
     except Exception as e:
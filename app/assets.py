@@ -0,0 +1,137 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import click
+import requests
+from flask import Blueprint, Response, abort, current_app, request, url_for
+from flask.cli import AppGroup
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/assets')
+assets_cli = AppGroup('assets', help='Static asset commands.')
+
+HASH_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+UNVERSIONED = 'public, max-age=3600'
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+
+BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist'
+FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0'
+# Third-party files served from app/static/vendor once `flask assets vendor`
+# has fetched them, and from their CDN until then
+VENDOR_ASSETS = {
+    'vendor/bootstrap/css/bootstrap.min.css': f'{BOOTSTRAP}/css/bootstrap.min.css',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js': f'{BOOTSTRAP}/js/bootstrap.bundle.min.js',
+    'vendor/fontawesome/css/all.min.css': f'{FONT_AWESOME}/css/all.min.css',
+    **{
+        f'vendor/fontawesome/webfonts/{font}.{ext}': f'{FONT_AWESOME}/webfonts/{font}.{ext}'
+        for font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+        for ext in ('woff2', 'ttf')
+    },
+}
+
+
+class AssetFingerprints:
+    """Content hashes of static files, recomputed only when a file's mtime changes"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._hashes = {}
+
+    def path(self, filename):
+        path = os.path.realpath(os.path.join(self.root, filename))
+        if not path.startswith(os.path.realpath(self.root) + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def get(self, filename):
+        """The content hash of filename, or None if it does not exist"""
+        path = self.path(filename)
+        if path is None:
+            return None
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._hashes.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._hashes[filename] = (mtime, digest)
+        return digest
+
+
+def get_fingerprints():
+    fingerprints = current_app.extensions.get('asset_fingerprints')
+    if fingerprints is None:
+        fingerprints = current_app.extensions['asset_fingerprints'] = AssetFingerprints(current_app.static_folder)
+    return fingerprints
+
+
+def asset_url(filename):
+    """URL of a static file with its content hash in the name, e.g. css/base.3f9a0c21d4e7.css"""
+    digest = get_fingerprints().get(filename)
+    if digest is None:
+        return url_for('static', filename=filename)
+    stem, ext = os.path.splitext(filename)
+    return url_for('assets.asset', filename=f'{stem}.{digest}{ext}')
+
+
+def vendor_url(filename):
+    """asset_url for a vendored third-party file, or its CDN URL if it has not been fetched"""
+    if get_fingerprints().get(filename) is None:
+        return VENDOR_ASSETS[filename]
+    return asset_url(filename)
+
+
+@assets_bp.route('/<path:filename>')
+def asset(filename):
+    """Serve a static file. Fingerprinted names whose hash is current are cached forever.
+
+    Unversioned names are served too, for url() references inside
+    stylesheets (e.g. Font Awesome's webfonts), with a short max-age.
+    """
+    match = _FINGERPRINTED.match(filename)
+    if match:
+        filename = match['stem'] + match['ext']
+
+    fingerprints = get_fingerprints()
+    path = fingerprints.path(filename)
+    if path is None:
+        abort(404)
+    digest = fingerprints.get(filename)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    response = Response(data, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.set_etag(digest)
+    if match and match['hash'] == digest:
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        # A stale hash (e.g. a page rendered before a deploy) gets the current file, briefly
+        response.headers['Cache-Control'] = UNVERSIONED
+    return response.make_conditional(request)
+
+
+@assets_cli.command('vendor')
+@click.option('--force', is_flag=True, help='Download files that are already present again.')
+def vendor_command(force):
+    """Download Bootstrap and Font Awesome into app/static so pages work offline."""
+    for filename, url in VENDOR_ASSETS.items():
+        path = os.path.join(current_app.static_folder, filename)
+        if os.path.exists(path) and not force:
+            click.echo(f'{filename}: present')
+            continue
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        click.echo(f'{filename}: {len(response.content):,} bytes from {url}')
+
+
+def init_app(app):
+    """Expose asset_url() and vendor_url() to templates"""
+    app.jinja_env.globals.update(asset_url=asset_url, vendor_url=vendor_url)
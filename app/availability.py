@@ -0,0 +1,187 @@
+import json
+import queue
+import threading
+from flask import Response, current_app, has_app_context, request
+from sqlalchemy import event, inspect
+from . import db
+from .models import Book
+
+_CHANGED_KEY = 'stock_changed_books'
+_PENDING_KEY = 'stock_messages'
+SUBSCRIPTION_QUEUE_SIZE = 256
+DEFAULT_HEARTBEAT = 15
+DEFAULT_MAX_STREAMS = 8
+RECONNECT_DELAY_MS = 3000
+
+
+class Subscription:
+    """Messages for one subscriber, buffered until its stream reads them"""
+
+    def __init__(self, broker, maxsize=SUBSCRIPTION_QUEUE_SIZE):
+        self.broker = broker
+        self.closed = False
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, message):
+        """Queue a message; a subscriber too far behind is closed instead"""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.close()
+
+    def get(self, timeout):
+        """The next message, or None if none arrived within timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.closed = True
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process publish/subscribe; only sees stock changes committed by this process.
+
+    With more than one worker process, a stream only hears about borrows
+    and returns handled by its own worker. A cross-process broker (e.g. Redis or PostgreSQL LISTEN/NOTIFY) can be
+    used instead by setting AVAILABILITY_BROKER to an object with the same
+    publish(message) and subscribe() methods.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self):
+        subscription = Subscription(self)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.put(message)
+
+
+def get_broker():
+    broker = current_app.extensions.get('availability_broker')
+    if broker is None:
+        broker = current_app.extensions['availability_broker'] = \
+            current_app.config.get('AVAILABILITY_BROKER') or LocalBroker()
+    return broker
+
+
+def get_stream_slots():
+    slots = current_app.extensions.get('availability_stream_slots')
+    if slots is None:
+        slots = current_app.extensions['availability_stream_slots'] = threading.BoundedSemaphore(
+            current_app.config.get('AVAILABILITY_MAX_STREAMS', DEFAULT_MAX_STREAMS))
+    return slots
+
+
+def mark_stock_changed(book_id):
+    """Publish book_id's available quantity once the current transaction commits.
+
+    ORM changes to Book.available_quantity are picked up automatically;
+    bulk UPDATE statements must call this.
+    """
+    db.session.info.setdefault(_CHANGED_KEY, set()).add(book_id)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_flushed_books(session, flush_context):
+    for book in (*session.new, *session.dirty):
+        if isinstance(book, Book) and (book in session.new or
+                                       inspect(book).attrs.available_quantity.history.has_changes()):
+            session.info.setdefault(_CHANGED_KEY, set()).add(book.id)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _read_changed_stock(session):
+    # Read the quantities now: no SQL can be emitted once the commit is done
+    session.flush()
+    book_ids = session.info.pop(_CHANGED_KEY, None)
+    if book_ids and has_app_context():
+        session.info[_PENDING_KEY] = [
+            {'book_id': book_id, 'available_quantity': available}
+            for book_id, available in session.query(Book.id, Book.available_quantity)
+            .filter(Book.id.in_(book_ids)).order_by(Book.id)
+        ]
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_changed_stock(session):
+    messages = session.info.pop(_PENDING_KEY, None)
+    if messages and has_app_context():
+        broker = get_broker()
+        for message in messages:
+            broker.publish(message)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _release_once(subscription, slots):
+    """close() for a stream: unsubscribes and frees its slot, however many times it is called"""
+    lock = threading.Lock()
+    released = False
+
+    def close():
+        nonlocal released
+        subscription.close()
+        with lock:
+            if released:
+                return
+            released = True
+        slots.release()
+    return close
+
+
+def _events(subscription, close, book_ids, heartbeat):
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        while not subscription.closed:
+            message = subscription.get(heartbeat)
+            if message is None:
+                # Keeps proxies from timing out and finds disconnected clients
+                yield ': keep-alive\n\n'
+            elif not book_ids or message['book_id'] in book_ids:
+                yield f'data: {json.dumps(message)}\n\n'
+    finally:
+        close()
+
+
+def event_stream():
+    """Server-Sent Events response of availability changes, optionally limited to ?book_id= values.
+
+    Each stream holds a worker thread for as long as it is open, so at most
+    AVAILABILITY_MAX_STREAMS run at once per process; further clients get
+    a 503 and retry later.
+    """
+    slots = get_stream_slots()
+    if not slots.acquire(blocking=False):
+        response = Response('Too many open availability streams', status=503, mimetype='text/plain')
+        response.headers['Retry-After'] = str(RECONNECT_DELAY_MS // 1000)
+        return response
+
+    book_ids = set(request.args.getlist('book_id', type=int))
+    subscription = get_broker().subscribe()
+    close = _release_once(subscription, slots)
+    heartbeat = current_app.config.get('AVAILABILITY_HEARTBEAT', DEFAULT_HEARTBEAT)
+    response = Response(_events(subscription, close, book_ids, heartbeat), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Also unsubscribes when the body is never iterated
+    response.call_on_close(close)
+    return response
@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import tuple_
+from . import db, openlibrary
+from .models import Book
+
+catalog_cli = AppGroup('catalog', help='Catalog maintenance commands.')
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+class AlreadyInCatalog(Exception):
+    def __init__(self, message='This book already exists in the library.'):
+        super().__init__(message)
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, dict) pairs from a CSV or JSONL stream without loading it all"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, InvalidRow(f'invalid JSON: {e.msg}')
+
+
+def clean_row(row):
+    """Validate one input record and return the column values for a Book"""
+    if isinstance(row, InvalidRow):
+        raise row
+    if not isinstance(row, dict):
+        raise InvalidRow('record is not an object')
+
+    isbn = str(row.get('isbn') or '').replace('-', '').replace(' ', '')
+    title = str(row.get('title') or '').strip()
+    author = str(row.get('author') or '').strip()
+    genre = str(row.get('genre') or '').strip()
+
+    if not 10 <= len(isbn) <= 13:
+        raise InvalidRow('isbn must be 10 to 13 characters')
+    if not title:
+        raise InvalidRow('missing title')
+    if not author:
+        raise InvalidRow('missing author')
+    if len(title) > 200 or len(author) > 100 or len(genre) > 50:
+        raise InvalidRow('title, author or genre is too long')
+
+    quantity = row.get('quantity')
+    if quantity is None or (isinstance(quantity, str) and not quantity.strip()):
+        quantity = 1
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise InvalidRow('quantity must be a whole number')
+    if quantity < 1:
+        raise InvalidRow('quantity must be at least 1')
+
+    return {
+        'isbn': isbn,
+        'title': title,
+        'author': author,
+        'genre': genre,
+        'quantity': quantity,
+        'available_quantity': quantity
+    }
+
+
+def import_books(stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None):
+    """Insert valid, previously unseen books from stream in chunked executemany batches.
+
+    Existing ISBNs are loaded into a set with one query up front, so
+    duplicates (in the database or earlier in the file) cost no lookups.
+    Returns a dict of inserted/duplicate/invalid counts.
+    """
+    seen = {isbn for isbn, in db.session.query(Book.isbn)}
+    insert = Book.__table__.insert()
+    stats = {'inserted': 0, 'duplicates': 0, 'invalid': 0}
+    chunk = []
+
+    def flush():
+        db.session.execute(insert, chunk)
+        db.session.commit()
+        stats['inserted'] += len(chunk)
+        chunk.clear()
+
+    for line_number, row in read_rows(stream, fmt):
+        try:
+            values = clean_row(row)
+        except InvalidRow as e:
+            stats['invalid'] += 1
+            if on_error:
+                on_error(line_number, str(e))
+            continue
+
+        if values['isbn'] in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(values['isbn'])
+
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    return stats
+
+
+def import_openlibrary_books(keys):
+    """Resolve Open Library keys concurrently and add the new books to the catalog.
+
+    Returns, per key in order, the created Book or the exception explaining
+    why it was skipped (lookup failure, or already in the catalog by ISBN
+    or by title and author).
+    """
+    deadline = current_app.config.get('OPENLIBRARY_IMPORT_DEADLINE', openlibrary.DEFAULT_IMPORT_DEADLINE)
+    records = openlibrary.resolve_books(openlibrary.get_client(), keys, deadline=deadline)
+    found = [r for r in records if isinstance(r, dict)]
+
+    existing_isbns = set()
+    existing_names = set()
+    if found:
+        existing = db.session.query(Book.isbn, Book.title, Book.author).filter(db.or_(
+            Book.isbn.in_({r['isbn'] for r in found}),
+            tuple_(Book.title, Book.author).in_({(r['title'], r['author']) for r in found})
+        ))
+        for isbn, title, author in existing:
+            existing_isbns.add(isbn)
+            existing_names.add((title, author))
+
+    results = []
+    for record in records:
+        if isinstance(record, Exception):
+            results.append(record)
+        elif record['isbn'] in existing_isbns or (record['title'], record['author']) in existing_names:
+            results.append(AlreadyInCatalog())
+        else:
+            existing_isbns.add(record['isbn'])
+            existing_names.add((record['title'], record['author']))
+            book = Book(quantity=1, available_quantity=1, **record)
+            db.session.add(book)
+            results.append(book)
+
+    db.session.flush()
+    ids = [r.id for r in results if isinstance(r, Book)]
+    db.session.commit()
+    if ids:
+        # Refresh the committed rows in one query rather than one per book
+        Book.query.filter(Book.id.in_(ids)).all()
+    return results
+
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Input format (default: from the file extension).')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Rows per INSERT batch and commit.')
+@click.option('--max-errors', default=20, show_default=True,
+              help='Invalid rows to print before staying quiet.')
+def import_command(path, fmt, chunk_size, max_errors):
+    """Bulk-load books from a CSV or JSONL file.
+
+    Expected fields: isbn, title, author, and optionally genre and quantity.
+    """
+    if fmt is None:
+        fmt = 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+
+    errors = 0
+
+    def on_error(line_number, message):
+        nonlocal errors
+        if errors < max_errors:
+            click.echo(f'line {line_number}: {message}', err=True)
+        errors += 1
+
+    started = time.perf_counter()
+    # utf-8-sig drops the byte order mark spreadsheet exports put before the header
+    with open(path, newline='', encoding='utf-8-sig') as stream:
+        stats = import_books(stream, fmt, chunk_size=chunk_size, on_error=on_error)
+    elapsed = time.perf_counter() - started
+
+    processed = stats['inserted'] + stats['duplicates'] + stats['invalid']
+    rate = processed / elapsed if elapsed else processed
+    click.echo(f"Imported {stats['inserted']} books, skipped {stats['duplicates']} duplicate "
+               f"and {stats['invalid']} invalid rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
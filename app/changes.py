@@ -0,0 +1,51 @@
+from flask import has_app_context
+from sqlalchemy import event
+from . import db
+
+_CHANGED_KEY = 'changed_tables'
+_listeners = []
+
+
+def on_commit(listener):
+    """Register listener(tables) to run after a commit that changed rows.
+
+    tables is the set of table names written by the transaction, whether
+    through flushed ORM objects or bulk ORM insert/update/delete statements.
+    Listeners run inside the app context of the committing request.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def _mark(session, tables):
+    session.info.setdefault(_CHANGED_KEY, set()).update(tables)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_flushed_changes(session, flush_context):
+    tables = {obj.__table__.name
+              for collection in (session.new, session.dirty, session.deleted)
+              for obj in collection if hasattr(obj, '__table__')}
+    if tables:
+        _mark(session, tables)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_changes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _mark(orm_execute_state.session, {table.name})
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_listeners(session):
+    tables = session.info.pop(_CHANGED_KEY, None)
+    if tables and has_app_context():
+        for listener in _listeners:
+            listener(tables)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_CHANGED_KEY, None)
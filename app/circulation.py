@@ -0,0 +1,169 @@
+from datetime import datetime
+from sqlalchemy import update
+from . import db, rollups
+from .availability import mark_stock_changed
+from .models import Book, Student, Borrowing
+
+
+class CirculationError(Exception):
+    """Base class for borrow/return failures that callers report to the user"""
+
+
+class BookUnavailable(CirculationError):
+    def __init__(self, message='No copies available for this book'):
+        super().__init__(message)
+
+
+class AlreadyReturned(CirculationError):
+    def __init__(self, message='Book has already been returned'):
+        super().__init__(message)
+
+
+class NotFound(CirculationError):
+    pass
+
+
+def take_copy(book_id):
+    """Atomically reserve one copy of a book.
+
+    The availability check and the decrement happen in one conditional
+    UPDATE, so two concurrent checkouts can never both take the last copy.
+    Returns False when the book has no copies left (or does not exist).
+    """
+    result = db.session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.available_quantity > 0)
+        .values(available_quantity=Book.available_quantity - 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    mark_stock_changed(book_id)
+    return True
+
+
+def release_copy(book_id):
+    """Put one copy of a book back on the shelf"""
+    db.session.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(available_quantity=Book.available_quantity + 1)
+        .execution_options(synchronize_session=False)
+    )
+    mark_stock_changed(book_id)
+
+
+def close_borrowing(borrowing_id, returned_at=None):
+    """Atomically mark an active borrowing returned.
+
+    Returns False if the borrowing was already returned, so a copy is
+    released at most once even when two returns race.
+    """
+    result = db.session.execute(
+        update(Borrowing)
+        .where(Borrowing.id == borrowing_id, Borrowing.status == 'borrowed')
+        .values(status='returned', return_date=returned_at or datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def borrow_book(student_id, book_id, commit=True):
+    """Check out one copy of book_id to student_id and return the Borrowing"""
+    if not take_copy(book_id):
+        raise BookUnavailable()
+
+    borrowing = Borrowing(student_id=student_id, book_id=book_id)
+    borrowing.borrow_date = datetime.utcnow()
+    db.session.add(borrowing)
+    rollups.record_borrows([borrowing])
+    if commit:
+        db.session.commit()
+    return borrowing
+
+
+def return_book(borrowing, commit=True):
+    """Return a borrowed book, releasing its copy exactly once"""
+    returned_at = datetime.utcnow()
+    if not close_borrowing(borrowing.id, returned_at):
+        raise AlreadyReturned()
+
+    release_copy(borrowing.book_id)
+    rollups.record_returns([borrowing], returned_at)
+    if commit:
+        db.session.commit()
+    else:
+        db.session.expire(borrowing)
+    return borrowing
+
+
+def delete_borrowing(borrowing, commit=True):
+    """Delete a borrowing record, releasing its copy if it was still out"""
+    rollups.forget_borrowings([borrowing])
+    if close_borrowing(borrowing.id):
+        release_copy(borrowing.book_id)
+    db.session.delete(borrowing)
+    if commit:
+        db.session.commit()
+
+
+def borrow_batch(items):
+    """Check out many (student_id, book_id) pairs in a single transaction.
+
+    Students and books are validated with one IN query each. Returns a list
+    with, for each item in order, either the new Borrowing or the
+    CirculationError explaining why that item was skipped.
+    """
+    student_ids = {student_id for student_id, _ in items}
+    book_ids = {book_id for _, book_id in items}
+    known_students = {id_ for id_, in db.session.query(Student.id).filter(Student.id.in_(student_ids))}
+    known_books = {id_ for id_, in db.session.query(Book.id).filter(Book.id.in_(book_ids))}
+
+    borrowed_at = datetime.utcnow()
+    results = []
+    for student_id, book_id in items:
+        if student_id not in known_students:
+            results.append(NotFound('Student not found'))
+        elif book_id not in known_books:
+            results.append(NotFound('Book not found'))
+        elif not take_copy(book_id):
+            results.append(BookUnavailable())
+        else:
+            borrowing = Borrowing(student_id=student_id, book_id=book_id)
+            borrowing.borrow_date = borrowed_at
+            results.append(borrowing)
+
+    # Added after the stock updates so autoflush doesn't insert them one by one
+    borrowings = [r for r in results if isinstance(r, Borrowing)]
+    db.session.add_all(borrowings)
+    db.session.flush()
+    rollups.record_borrows(borrowings)
+    db.session.commit()
+    return results
+
+
+def return_batch(borrowing_ids):
+    """Return many borrowings in a single transaction.
+
+    Returns a list with, for each id in order, either the returned
+    Borrowing or the CirculationError explaining why it was skipped.
+    """
+    borrowings = {
+        b.id: b for b in Borrowing.query.filter(Borrowing.id.in_(set(borrowing_ids)))
+    }
+
+    returned_at = datetime.utcnow()
+    results = []
+    for borrowing_id in borrowing_ids:
+        borrowing = borrowings.get(borrowing_id)
+        if borrowing is None:
+            results.append(NotFound('Borrowing record not found'))
+        elif not close_borrowing(borrowing_id, returned_at):
+            results.append(AlreadyReturned())
+        else:
+            release_copy(borrowing.book_id)
+            results.append(borrowing)
+
+    rollups.record_returns([r for r in results if isinstance(r, Borrowing)], returned_at)
+    db.session.commit()
+    return results
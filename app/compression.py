@@ -0,0 +1,93 @@
+import gzip
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without the brotli package
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+}
+
+
+def _encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level)
+
+
+def _compress_stream(chunks, encoding, level, body=None):
+    """Compress an iterable of byte chunks, flushing after each so streamed rows still arrive promptly.
+
+    body is the response iterable the chunks are drawn from. It is closed
+    along with the stream, so a stream_with_context body tears down its
+    request context as soon as the client is done.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    try:
+        for chunk in chunks:
+            data = compress(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        for iterable in (chunks, body):
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+
+def _compress_response(response):
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+
+    level = current_app.config.get('COMPRESS_LEVEL', DEFAULT_LEVEL)
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding, level, body=response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+        response.set_data(_compress(data, encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    # The body now differs byte-for-byte from the identity encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Compress text responses for clients that accept gzip (or brotli, when installed).
+
+    Bodies smaller than COMPRESS_MIN_SIZE bytes are sent as-is; streamed
+    bodies (CSV exports, NDJSON) are always compressed chunk by chunk.
+    """
+    app.after_request(_compress_response)
@@ -0,0 +1,63 @@
+import os
+from sqlalchemy import event
+
+# Production defaults for SQLite: WAL lets readers run alongside a writer,
+# busy_timeout makes writers queue instead of failing with "database is locked",
+# and synchronous=NORMAL is durable under WAL while skipping an fsync per commit.
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+_PRAGMA_ENV = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'temp_store': 'SQLITE_TEMP_STORE',
+}
+
+_POOL_ENV = {
+    'pool_size': 'DB_POOL_SIZE',
+    'max_overflow': 'DB_MAX_OVERFLOW',
+    'pool_timeout': 'DB_POOL_TIMEOUT',
+    'pool_recycle': 'DB_POOL_RECYCLE',
+}
+
+
+def load_database_config(app):
+    """Fill database settings from the environment, keeping explicit config values"""
+    if 'DATABASE_URL' in os.environ:
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    for pragma, var in _PRAGMA_ENV.items():
+        if var in os.environ:
+            pragmas[pragma] = os.environ[var]
+    app.config.setdefault('SQLITE_PRAGMAS', pragmas)
+
+    engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    for option, var in _POOL_ENV.items():
+        if var in os.environ:
+            engine_options.setdefault(option, int(os.environ[var]))
+    if os.environ.get('DB_POOL_PRE_PING', '').lower() == 'true':
+        engine_options.setdefault('pool_pre_ping', True)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the PRAGMA statements on every new connection the engine opens"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma}={value}')
+        cursor.close()
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from flask import Response, request, stream_with_context
+
+CHUNK_SIZE = 64 * 1024
+YIELD_PER = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def iter_csv(header, rows):
+    """Encode rows as CSV text, yielding roughly CHUNK_SIZE characters at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def csv_response(filename, header, rows):
+    """Stream rows to the client as a CSV attachment.
+
+    rows is consumed lazily while the response is being sent, so it should
+    be a generator over a query (e.g. one using yield_per) rather than a list.
+    """
+    return Response(
+        stream_with_context(iter_csv(header, rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+def wants_ndjson():
+    """True when the client asked for ?format=ndjson or prefers application/x-ndjson"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def iter_ndjson(records):
+    """Encode dicts as newline-delimited JSON, yielding roughly CHUNK_SIZE characters at a time"""
+    lines = []
+    size = 0
+    for record in records:
+        line = json.dumps(record, separators=(',', ':'))
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+            size = 0
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def ndjson_response(records):
+    """Stream records (a lazy iterable of dicts) as one JSON document per line"""
+    return Response(stream_with_context(iter_ndjson(records)), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,53 @@
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from . import db, changes
+from .cache import TTLCache
+from .models import Student
+from .versioning import table_versions
+
+DEFAULT_USER_CACHE_TTL = 60
+DEFAULT_USER_CACHE_SIZE = 1024
+
+
+def get_user_cache():
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = current_app.extensions['user_cache'] = TTLCache(
+            maxsize=current_app.config.get('USER_CACHE_SIZE', DEFAULT_USER_CACHE_SIZE),
+            ttl=current_app.config.get('USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL))
+    return cache
+
+
+def load_student(student_id):
+    """Return the logged-in Student, from the identity cache when possible.
+
+    The cache keeps each student's column values. A hit rebuilds the
+    instance and merges it into the session with load=False, so it behaves
+    like a loaded row (relationships still lazy-load) without loading the
+    student. Entries are keyed on the student table's data_version, so a
+    demotion or deletion committed by any process misses the cache on the
+    next request; commits from this process also clear it. Set
+    USER_CACHE_TTL to 0 to disable the cache.
+    """
+    if not current_app.config.get('USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL):
+        return db.session.get(Student, student_id)
+
+    cache = get_user_cache()
+    key = (student_id, table_versions(('student',)))
+    values = cache.get(key)
+    if values is None:
+        student = db.session.get(Student, student_id)
+        if student is not None:
+            cache.set(key, {attr.key: getattr(student, attr.key)
+                                   for attr in Student.__mapper__.column_attrs})
+        return student
+
+    student = Student(**values)
+    make_transient_to_detached(student)
+    return db.session.merge(student, load=False)
+
+
+@changes.on_commit
+def _invalidate_users(tables):
+    if 'student' in tables:
+        get_user_cache().clear()
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from . import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+class RequestMetrics:
+    """Per-endpoint latency histograms and SQL counters, rendered in Prometheus text format"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._requests = {}
+        self._queries = {}
+        self._sql_seconds = {}
+
+    def observe(self, endpoint, method, status, seconds, queries, sql_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+            self._requests[key + (status,)] = self._requests.get(key + (status,), 0) + 1
+            self._queries[key] = self._queries.get(key, 0) + queries
+            self._sql_seconds[key] = self._sql_seconds.get(key, 0.0) + sql_seconds
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += ['# HELP edulib_http_request_duration_seconds Time spent handling requests, including streamed bodies.',
+                      '# TYPE edulib_http_request_duration_seconds histogram']
+            for (endpoint, method), histogram in sorted(self._latency.items()):
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append(f'edulib_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'edulib_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f'edulib_http_request_duration_seconds_sum{{{labels}}} {histogram["sum"]:.6f}')
+                lines.append(f'edulib_http_request_duration_seconds_count{{{labels}}} {histogram["count"]}')
+
+            lines += ['# HELP edulib_http_requests_total Requests handled, by response status.',
+                      '# TYPE edulib_http_requests_total counter']
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'edulib_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += ['# HELP edulib_db_queries_total SQL statements executed while handling requests.',
+                      '# TYPE edulib_db_queries_total counter']
+            for (endpoint, method), count in sorted(self._queries.items()):
+                lines.append(f'edulib_db_queries_total{{endpoint="{endpoint}",method="{method}"}} {count}')
+
+            lines += ['# HELP edulib_db_query_duration_seconds_total Time spent executing SQL while handling requests.',
+                      '# TYPE edulib_db_query_duration_seconds_total counter']
+            for (endpoint, method), seconds in sorted(self._sql_seconds.items()):
+                lines.append(f'edulib_db_query_duration_seconds_total{{endpoint="{endpoint}",method="{method}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestTrace:
+    """SQL activity of one request; statements are kept only when slow-request logging or profiling is on"""
+
+    def __init__(self, keep_statements):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = [] if keep_statements else None
+        self.finish_callbacks = []
+
+    def keep_statements(self):
+        if self.statements is None:
+            self.statements = []
+
+    def on_finish(self, callback):
+        """Call callback(trace, seconds, status) once the response body has been sent"""
+        self.finish_callbacks.append(callback)
+
+    def add(self, statement, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        if self.statements is not None:
+            self.statements.append((statement, seconds))
+
+
+def get_metrics():
+    metrics = current_app.extensions.get('metrics')
+    if metrics is None:
+        metrics = current_app.extensions['metrics'] = RequestMetrics()
+    return metrics
+
+
+def current_trace():
+    return g.get('request_trace') if has_request_context() else None
+
+
+def instrument_engine(engine):
+    """Time every statement run on engine and attribute it to the current request"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        trace = current_trace()
+        if trace is not None:
+            trace.add(statement, time.perf_counter() - started)
+
+
+def _start_request():
+    g.request_trace = RequestTrace(keep_statements=current_app.config['SLOW_REQUEST_MS'] is not None)
+
+
+def _finish_request(response):
+    trace = g.get('request_trace')
+    if trace is None:
+        return response
+
+    metrics = get_metrics()
+    logger = current_app.logger
+    slow_ms = current_app.config['SLOW_REQUEST_MS']
+    endpoint = request.endpoint or 'unmatched'
+    method, path, status = request.method, request.full_path.rstrip('?'), response.status_code
+
+    def record():
+        seconds = time.perf_counter() - trace.started
+        metrics.observe(endpoint, method, status, seconds, trace.queries, trace.sql_seconds)
+        for callback in trace.finish_callbacks:
+            callback(trace, seconds, status)
+        if slow_ms is not None and seconds * 1000 >= slow_ms:
+            statements = '\n'.join(f'  {duration * 1000:8.2f} ms  {statement}'
+                                   for statement, duration in trace.statements)
+            logger.warning('Slow request %s %s: %.1f ms, %d queries, %.1f ms in SQL\n%s',
+                           method, path, seconds * 1000, trace.queries, trace.sql_seconds * 1000, statements)
+
+    if response.is_streamed:
+        # Streamed bodies (CSV exports) run their queries after this hook, so
+        # record once the body has been fully sent instead
+        body = response.response
+
+        def drain():
+            try:
+                yield from body
+            finally:
+                record()
+        response.response = drain()
+    else:
+        record()
+    return response
+
+
+def init_app(app):
+    """Record request latency and SQL activity for /metrics, logging requests slower than SLOW_REQUEST_MS"""
+    if 'SLOW_REQUEST_MS' not in app.config:
+        threshold = os.environ.get('SLOW_REQUEST_MS')
+        app.config['SLOW_REQUEST_MS'] = float(threshold) if threshold else None
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    with app.app_context():
+        instrument_engine(db.engine)
+
+
+@metrics_bp.route('/metrics')
+def prometheus_metrics():
+    return Response(get_metrics().render(), content_type=CONTENT_TYPE)
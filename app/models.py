@@ -4,13 +4,17 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
 
 class Book(db.Model):
+    __table_args__ = (
+        db.Index('ix_book_genre_title', 'genre', 'title'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     isbn = db.Column(db.String(13), unique=True, nullable=False)
-    title = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(200), nullable=False, index=True)
     author = db.Column(db.String(100), nullable=False)
     genre = db.Column(db.String(50))
     quantity = db.Column(db.Integer, nullable=False, default=1)
-    available_quantity = db.Column(db.Integer, nullable=False, default=1)
+    available_quantity = db.Column(db.Integer, nullable=False, default=1, index=True)
 
     borrowings = db.relationship('Borrowing', backref='book', lazy=True)
 
@@ -18,9 +22,9 @@ class Student(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
-    full_name = db.Column(db.String(100), nullable=False)
+    full_name = db.Column(db.String(100), nullable=False, index=True)
     class_name = db.Column(db.String(50), nullable=False)  
-    school = db.Column(db.String(100), nullable=False)
+    school = db.Column(db.String(100), nullable=False, index=True)
     contact = db.Column(db.String(100))
     is_admin = db.Column(db.Boolean, default=False)
 
@@ -33,15 +37,59 @@ class Student(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
 class Borrowing(db.Model):
+    __table_args__ = (
+        db.Index('ix_borrowing_status_due_date', 'status', 'due_date'),
+        db.Index('ix_borrowing_student_id_status', 'student_id', 'status'),
+        db.Index('ix_borrowing_book_id_status', 'book_id', 'status'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
-    borrow_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    due_date = db.Column(db.DateTime, nullable=False)
+    borrow_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    due_date = db.Column(db.DateTime, nullable=False, index=True)
     return_date = db.Column(db.DateTime)
     status = db.Column(db.String(20), nullable=False, default='borrowed')  
 
     def __init__(self, student_id, book_id, due_days=14):
         self.student_id = student_id
         self.book_id = book_id
-        self.due_date = datetime.utcnow() + timedelta(days=due_days)
\ No newline at end of file
+        self.due_date = datetime.utcnow() + timedelta(days=due_days)
+
+class BookDailyCirculation(db.Model):
+    """Borrows and returns of one book on one (UTC) day, maintained by app.rollups"""
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    borrows = db.Column(db.Integer, nullable=False, default=0)
+    returns = db.Column(db.Integer, nullable=False, default=0)
+
+class SchoolDailyCirculation(db.Model):
+    """Borrows and returns by students of one school on one (UTC) day, maintained by app.rollups"""
+    school = db.Column(db.String(100), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    borrows = db.Column(db.Integer, nullable=False, default=0)
+    returns = db.Column(db.Integer, nullable=False, default=0)
+
+class BookCirculationTotal(db.Model):
+    """All-time borrows and returns of one book, maintained by app.rollups"""
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    borrows = db.Column(db.Integer, nullable=False, default=0, index=True)
+    returns = db.Column(db.Integer, nullable=False, default=0)
+
+class BookNeighbor(db.Model):
+    """A book often borrowed by the same students as book_id, rebuilt by app.recommendations"""
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('book.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+
+class DataVersion(db.Model):
+    """Change counter of one table, bumped on every write by the triggers in app.versioning"""
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    modified_at = db.Column(db.Float, nullable=False)
+
+class SchoolCirculationTotal(db.Model):
+    """All-time borrows and returns by students of one school, maintained by app.rollups"""
+    school = db.Column(db.String(100), primary_key=True)
+    borrows = db.Column(db.Integer, nullable=False, default=0)
+    returns = db.Column(db.Integer, nullable=False, default=0)
\ No newline at end of file
@@ -0,0 +1,191 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .cache import TTLCache, SQLiteCache
+
+DEFAULT_BASE_URL = 'https://openlibrary.org'
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_CACHE_TTL = 60 * 60
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IMPORT_DEADLINE = 10
+
+
+class OpenLibraryError(Exception):
+    pass
+
+
+class OpenLibraryClient:
+    """Open Library HTTP client with a keep-alive connection pool and response cache.
+
+    Successful JSON responses are cached in a bounded in-process LRU with TTL
+    and, when persistent_cache is given, in a second tier that survives restarts.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=DEFAULT_TIMEOUT,
+                 cache_ttl=DEFAULT_CACHE_TTL, cache_size=DEFAULT_CACHE_SIZE,
+                 persistent_cache=None, pool_size=DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.persistent_cache = persistent_cache
+
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'EduLib-Library-Management-System'
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='openlibrary')
+
+    def get_json(self, path, params=None):
+        """GET base_url + path and return the decoded JSON, using the cache when possible"""
+        key = path
+        if params:
+            key += '?' + '&'.join(f'{k}={v}' for k, v in sorted(params.items()))
+
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        if self.persistent_cache is not None:
+            data = self.persistent_cache.get(key)
+            if data is not None:
+                self.cache.set(key, data)
+                return data
+
+        try:
+            response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise OpenLibraryError(f'Open Library request failed: {e}') from e
+        if response.status_code != 200:
+            raise OpenLibraryError(f'Open Library returned HTTP {response.status_code} for {path}')
+        data = response.json()
+
+        self.cache.set(key, data)
+        if self.persistent_cache is not None:
+            self.persistent_cache.set(key, data)
+        return data
+
+    def fetch_many(self, paths, timeout=None):
+        """Fetch several paths concurrently on the client's bounded thread pool.
+
+        Returns a dict mapping each path to its JSON, or to an
+        OpenLibraryError if it failed or was still running after timeout seconds.
+        """
+        futures = {path: self.executor.submit(self.get_json, path) for path in set(paths)}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for path, future in futures.items():
+            if not future.done():
+                future.cancel()
+                results[path] = OpenLibraryError(f'Timed out fetching {path}')
+            elif future.exception() is not None:
+                error = future.exception()
+                results[path] = error if isinstance(error, OpenLibraryError) else OpenLibraryError(str(error))
+            else:
+                results[path] = future.result()
+        return results
+
+    def search(self, query, limit=20):
+        return self.get_json('/search.json', {'q': query, 'limit': limit})
+
+    def get_work(self, key):
+        """Fetch a work or edition record, e.g. key='/works/OL45804W'"""
+        return self.get_json(record_path(key))
+
+    def get_author(self, key):
+        """Fetch an author record, e.g. key='/authors/OL34184A'"""
+        return self.get_json(record_path(key))
+
+
+def record_path(key):
+    return f"/{key.strip('/')}.json"
+
+
+def editions_path(key):
+    return f"/{key.strip('/')}/editions.json"
+
+
+def resolve_books(client, keys, deadline=DEFAULT_IMPORT_DEADLINE):
+    """Build Book field values for many Open Library work/edition keys.
+
+    Lookups fan out in two concurrent rounds bounded by the client's pool:
+    first every work, then every author (and the editions of works that
+    carry no ISBN themselves). Anything not back before the deadline is
+    treated as missing. Returns, per key in order, a dict of title/author/
+    isbn/genre or the OpenLibraryError that prevented the import.
+    """
+    expires_at = time.monotonic() + deadline
+
+    def remaining():
+        return max(0, expires_at - time.monotonic())
+
+    works = client.fetch_many([record_path(key) for key in keys], timeout=remaining())
+
+    followups = []
+    for key in keys:
+        work = works[record_path(key)]
+        if isinstance(work, OpenLibraryError):
+            continue
+        followups.extend(record_path(ref['key']) for ref in work.get('authors', [])
+                         if isinstance(ref, dict) and 'key' in ref)
+        if not (work.get('isbn_13') or work.get('isbn_10')):
+            followups.append(editions_path(key))
+    details = client.fetch_many(followups, timeout=remaining()) if followups else {}
+
+    records = []
+    for key in keys:
+        work = works[record_path(key)]
+        if isinstance(work, OpenLibraryError):
+            records.append(work)
+            continue
+
+        author_names = []
+        for ref in work.get('authors', []):
+            if isinstance(ref, dict) and 'key' in ref:
+                author = details.get(record_path(ref['key']))
+                if isinstance(author, dict):
+                    author_names.append(author.get('name', 'Unknown Author'))
+
+        isbns = work.get('isbn_13', []) + work.get('isbn_10', [])
+        editions = details.get(editions_path(key))
+        if not isbns and isinstance(editions, dict):
+            for edition in editions.get('entries', []):
+                isbns = edition.get('isbn_13', []) + edition.get('isbn_10', [])
+                if isbns:
+                    break
+
+        if not isbns:
+            records.append(OpenLibraryError('No ISBN found for this book'))
+            continue
+
+        subjects = work.get('subjects', [])
+        records.append({
+            'title': work.get('title', 'Unknown Title'),
+            'author': ', '.join(author_names) if author_names else 'Unknown Author',
+            'isbn': isbns[0],
+            'genre': subjects[0] if subjects else 'Unknown'
+        })
+    return records
+
+
+def get_client():
+    """Return the app's shared Open Library client, creating it on first use"""
+    client = current_app.extensions.get('openlibrary')
+    if client is None:
+        config = current_app.config
+        ttl = config.get('OPENLIBRARY_CACHE_TTL', DEFAULT_CACHE_TTL)
+        cache_path = config.get('OPENLIBRARY_CACHE_PATH')
+        client = current_app.extensions['openlibrary'] = OpenLibraryClient(
+            base_url=config.get('OPENLIBRARY_BASE_URL', DEFAULT_BASE_URL),
+            timeout=config.get('OPENLIBRARY_TIMEOUT', DEFAULT_TIMEOUT),
+            cache_ttl=ttl,
+            cache_size=config.get('OPENLIBRARY_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+            persistent_cache=SQLiteCache(cache_path, ttl=ttl) if cache_path else None
+        )
+    return client
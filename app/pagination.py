@@ -0,0 +1,32 @@
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def get_page_args():
+    """Read and clamp the ?limit= and ?after= keyset pagination params"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    after = request.args.get('after', type=int)
+    return limit, after
+
+
+def keyset_paginate(query, key_column, limit, after=None):
+    """Return one page of rows ordered on key_column, plus the next cursor.
+
+    Rows are filtered with key_column > after instead of using OFFSET, so
+    every page is a single index range scan no matter how deep it is.
+    One extra row is fetched to know whether another page exists.
+    """
+    if after is not None:
+        query = query.filter(key_column > after)
+
+    rows = query.order_by(key_column).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(getattr(rows[-1], key_column.key))
+
+    return rows, next_cursor
@@ -0,0 +1,156 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import secrets
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, request
+from flask_login import current_user
+from .metrics import current_trace
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = '_profile'
+DEFAULT_PROFILE_KEEP = 50
+TOP_FUNCTIONS = 30
+_CAPTURE_RE = re.compile(r'^(\d+)-[0-9a-f]+\.json$')
+
+
+class ProfileStore:
+    """Ring buffer of captured request profiles kept on disk.
+
+    Each capture is a .json summary (request, timings, SQL trace and top
+    functions by cumulative time) next to the raw .prof file, which loads
+    in pstats or snakeviz. Only the newest `keep` captures are retained.
+    """
+
+    def __init__(self, directory, keep=DEFAULT_PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, summary, profiler):
+        profile_id = f'{time.time_ns()}-{secrets.token_hex(3)}'
+        summary = dict(summary, id=profile_id, top_functions=top_functions(profiler))
+        with self._lock:
+            profiler.dump_stats(self.prof_path(profile_id))
+            with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+                json.dump(summary, f)
+            for stale in self._ids()[self.keep:]:
+                for suffix in ('.json', '.prof'):
+                    try:
+                        os.remove(os.path.join(self.directory, stale + suffix))
+                    except FileNotFoundError:
+                        pass
+        return profile_id
+
+    def list(self):
+        """Summaries of the retained captures, newest first, without their function and SQL lists"""
+        summaries = []
+        for profile_id in self._ids():
+            summary = self.get(profile_id)
+            if summary is not None:
+                summary.pop('top_functions', None)
+                summary.pop('statements', None)
+                summaries.append(summary)
+        return summaries
+
+    def get(self, profile_id):
+        try:
+            with open(os.path.join(self.directory, f'{os.path.basename(profile_id)}.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def prof_path(self, profile_id):
+        return os.path.join(self.directory, f'{os.path.basename(profile_id)}.prof')
+
+    def _ids(self):
+        # Only the store's own <timestamp>-<suffix>.json captures; other files are left alone
+        captures = [(int(match.group(1)), match.group(0)[:-5])
+                    for match in map(_CAPTURE_RE.match, os.listdir(self.directory)) if match]
+        return [profile_id for _, profile_id in sorted(captures, reverse=True)]
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, calls, total_time, cumulative_time, callers = stats.stats[func]
+        rows.append({
+            'function': pstats.func_std_string(func),
+            'calls': calls,
+            'tottime_ms': round(total_time * 1000, 3),
+            'cumtime_ms': round(cumulative_time * 1000, 3),
+        })
+    return rows
+
+
+def get_profile_store():
+    store = current_app.extensions.get('profile_store')
+    if store is None:
+        directory = current_app.config.get('PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+        store = current_app.extensions['profile_store'] = ProfileStore(
+            directory, keep=current_app.config.get('PROFILE_KEEP', DEFAULT_PROFILE_KEEP))
+    return store
+
+
+def profiling_requested():
+    return (request.headers.get(PROFILE_HEADER) == '1' or request.args.get(PROFILE_PARAM) == '1')
+
+
+def _start_profile():
+    if not current_app.config.get('PROFILING_ENABLED', True) or not profiling_requested():
+        return
+    if not (current_user.is_authenticated and current_user.is_admin):
+        return
+    trace = current_trace()
+    if trace is None:
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active on this thread
+        return
+    g.profiler = profiler
+    trace.keep_statements()
+
+    store = get_profile_store()
+    summary = {
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'user': current_user.email,
+        'captured_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC'),
+    }
+
+    def finish(trace, seconds, status):
+        profiler.disable()
+        store.save(dict(summary,
+                        status=status,
+                        duration_ms=round(seconds * 1000, 3),
+                        queries=trace.queries,
+                        sql_ms=round(trace.sql_seconds * 1000, 3),
+                        statements=[{'sql': statement, 'ms': round(duration * 1000, 3)}
+                                    for statement, duration in trace.statements]),
+                   profiler)
+    trace.on_finish(finish)
+
+
+def _stop_profile(exc):
+    # The finish callback never runs when an exception propagates out of the
+    # view, so make sure the profiler does not stay enabled on this thread
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+
+def init_app(app):
+    """Profile admin requests sent with `X-Profile: 1` or `?_profile=1`. Requires metrics.init_app first."""
+    app.before_request(_start_profile)
+    app.teardown_request(_stop_profile)
@@ -0,0 +1,183 @@
+import math
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from . import db
+from .models import Book, Borrowing, BookCirculationTotal, BookNeighbor
+
+try:
+    import numpy as np
+except ImportError:  # optional: the rebuild falls back to pure Python without NumPy
+    np = None
+
+recommendations_cli = AppGroup('recommendations', help='Book recommendation commands.')
+
+DEFAULT_NEIGHBORS = 20
+SEED_BOOKS = 20
+INSERT_BATCH_SIZE = 5000
+# Co-borrow pairs expanded at once by the NumPy rebuild; bounds its memory use
+PAIR_BLOCK_SIZE = 1_000_000
+
+
+def _borrowed_pairs():
+    """Distinct (student_id, book_id) pairs, ordered by student, streamed from the database"""
+    return db.session.execute(
+        select(Borrowing.student_id, Borrowing.book_id).distinct()
+        .order_by(Borrowing.student_id, Borrowing.book_id)
+        .execution_options(yield_per=INSERT_BATCH_SIZE)
+    )
+
+
+def _book_blocks(cost, limit):
+    """Split books into consecutive [first, last) ranges whose summed cost stays within limit"""
+    cumulative = np.cumsum(cost)
+    first = 0
+    while first < len(cost):
+        done = cumulative[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(cumulative, done + limit, side='right')))
+        yield first, last
+        first = last
+
+
+def _neighbors_numpy(pairs, k, block_size=PAIR_BLOCK_SIZE):
+    flat = np.fromiter(chain.from_iterable(pairs), dtype=np.int64)
+    if not flat.size:
+        return
+    book_ids, columns = np.unique(flat[1::2], return_inverse=True)
+    _, rows = np.unique(flat[0::2], return_inverse=True)
+    del flat
+    n_books = len(book_ids)
+    readers = np.bincount(columns, minlength=n_books).astype(np.float64)
+
+    # Sparse student x book matrix, as each student's books (pairs arrive
+    # ordered by student) and as each book's readers
+    basket_sizes = np.bincount(rows)
+    basket_starts = np.cumsum(basket_sizes) - basket_sizes
+    book_readers = rows[np.argsort(columns, kind='stable')]
+    reader_starts = np.concatenate(([0], np.cumsum(readers.astype(np.int64))))
+
+    # Item-item product one block of books at a time: each reader of a book
+    # in the block contributes every book in their basket
+    cost = np.bincount(columns, weights=basket_sizes[rows], minlength=n_books)
+    for first, last in _book_blocks(cost, block_size):
+        block_readers = book_readers[reader_starts[first]:reader_starts[last]]
+        block_books = np.repeat(np.arange(last - first), np.diff(reader_starts[first:last + 1]))
+        sizes = basket_sizes[block_readers]
+        left = np.repeat(block_books, sizes)
+        offsets = np.arange(left.size) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        right = columns[np.repeat(basket_starts[block_readers], sizes) + offsets]
+        keep = left + first != right
+        keys, co_borrows = np.unique(left[keep] * n_books + right[keep], return_counts=True)
+        left, right = np.divmod(keys, n_books)
+        left += first
+
+        scores = co_borrows / np.sqrt(readers[left] * readers[right])
+        order = np.lexsort((right, -scores, left))
+        left, right, scores = left[order], right[order], scores[order]
+        group_start = np.searchsorted(left, left)
+        top = np.arange(left.size) - group_start < k
+        yield from zip(book_ids[left[top]].tolist(), book_ids[right[top]].tolist(), scores[top].tolist())
+
+
+def _neighbors_python(pairs, k):
+    baskets = defaultdict(list)
+    readers = Counter()
+    for student_id, book_id in pairs:
+        baskets[student_id].append(book_id)
+        readers[book_id] += 1
+
+    co_borrows = defaultdict(Counter)
+    for basket in baskets.values():
+        for book_id in basket:
+            row = co_borrows[book_id]
+            for other_id in basket:
+                if other_id != book_id:
+                    row[other_id] += 1
+
+    for book_id in sorted(co_borrows):
+        row = co_borrows[book_id]
+        scored = sorted(((n / math.sqrt(readers[book_id] * readers[other_id]), other_id)
+                         for other_id, n in row.items()), key=lambda item: (-item[0], item[1]))
+        for score, other_id in scored[:k]:
+            yield book_id, other_id, score
+
+
+def _neighbors(pairs, k):
+    if np is not None:
+        return _neighbors_numpy(pairs, k)
+    return _neighbors_python(pairs, k)
+
+
+def similar_books(pairs, k=DEFAULT_NEIGHBORS):
+    """Top-k neighbors per book as (book_id, neighbor_id, score) from (student_id, book_id) pairs.
+
+    Scores are the cosine similarity of the books' columns in the binary
+    student x book borrow matrix: students who borrowed both, divided by
+    the geometric mean of each book's readers. Pairs must be distinct and
+    ordered by student.
+    """
+    return list(_neighbors(pairs, k))
+
+
+def rebuild(k=DEFAULT_NEIGHBORS):
+    """Recompute the book neighbor table from the borrowing history and commit. Returns the row count.
+
+    Neighbors are inserted in batches as they are computed, so the full
+    table is never held in memory.
+    """
+    insert = BookNeighbor.__table__.insert()
+    db.session.execute(BookNeighbor.__table__.delete())
+    count = 0
+    batch = []
+    for book_id, neighbor_id, score in _neighbors(_borrowed_pairs(), k):
+        batch.append({'book_id': book_id, 'neighbor_id': neighbor_id, 'score': score})
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.session.execute(insert, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert, batch)
+        count += len(batch)
+    db.session.commit()
+    return count
+
+
+def recommend_books(borrowings, limit=5):
+    """Books to suggest to a student with these borrowings, best first.
+
+    Sums the precomputed neighbor scores of the student's most recently
+    borrowed books, leaving out anything already borrowed. Students with
+    no history, or whose books have no neighbors yet, get the most
+    borrowed books instead.
+    """
+    borrowings = sorted(borrowings, key=lambda b: b.borrow_date, reverse=True)
+    borrowed = {b.book_id for b in borrowings}
+    seeds = list(dict.fromkeys(b.book_id for b in borrowings))[:SEED_BOOKS]
+
+    if seeds:
+        score = func.sum(BookNeighbor.score)
+        books = Book.query.join(BookNeighbor, BookNeighbor.neighbor_id == Book.id) \
+            .filter(BookNeighbor.book_id.in_(seeds), BookNeighbor.neighbor_id.notin_(borrowed)) \
+            .group_by(Book.id).order_by(score.desc(), Book.id).limit(limit).all()
+        if books:
+            return books
+
+    query = Book.query.join(BookCirculationTotal, BookCirculationTotal.book_id == Book.id) \
+        .filter(BookCirculationTotal.borrows > 0)
+    if borrowed:
+        query = query.filter(Book.id.notin_(borrowed))
+    return query.order_by(BookCirculationTotal.borrows.desc(), Book.id).limit(limit).all()
+
+
+@recommendations_cli.command('rebuild')
+@click.option('--neighbors', '-k', default=DEFAULT_NEIGHBORS, show_default=True,
+              help='Similar books to keep per book.')
+def rebuild_command(neighbors):
+    """Recompute book-to-book similarities from the full borrowing history."""
+    started = time.perf_counter()
+    rows = rebuild(neighbors)
+    click.echo(f'Stored {rows} book neighbors ({"NumPy" if np is not None else "pure Python"}) '
+               f'in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,188 @@
+import time
+from collections import Counter
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, literal, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from . import db
+from .models import (Book, Student, Borrowing, BookDailyCirculation, SchoolDailyCirculation,
+                     BookCirculationTotal, SchoolCirculationTotal)
+
+rollups_cli = AppGroup('rollups', help='Circulation rollup maintenance commands.')
+
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _add_counts(model, key_columns, counts, column):
+    """Add each count to `column` of the row keyed by its key tuple, creating missing rows"""
+    if not counts:
+        return
+    table = model.__table__
+    rows = [dict(zip(key_columns, key), borrows=0, returns=0) for key in counts]
+    for row, n in zip(rows, counts.values()):
+        row[column] = n
+    rows = [row for row in rows if row[column]]
+    if not rows:
+        return
+
+    insert = _UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns,
+                                          set_={column: table.c[column] + stmt.excluded[column]})
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        matched = db.session.execute(
+            update(table)
+            .where(*(table.c[name] == row[name] for name in key_columns))
+            .values({column: table.c[column] + row[column]})
+        ).rowcount
+        if not matched:
+            db.session.execute(table.insert(), [row])
+
+
+def _record(events, column, sign=1):
+    """Apply (student_id, book_id, day) events to every rollup, in the current transaction"""
+    events = list(events)
+    if not events:
+        return
+    student_ids = {student_id for student_id, _, _ in events}
+    schools = dict(db.session.query(Student.id, Student.school).filter(Student.id.in_(student_ids)))
+
+    book_days, school_days = Counter(), Counter()
+    book_totals, school_totals = Counter(), Counter()
+    for student_id, book_id, day in events:
+        book_days[(book_id, day)] += sign
+        book_totals[(book_id,)] += sign
+        if student_id in schools:
+            school_days[(schools[student_id], day)] += sign
+            school_totals[(schools[student_id],)] += sign
+    _add_counts(BookDailyCirculation, ['book_id', 'day'], book_days, column)
+    _add_counts(SchoolDailyCirculation, ['school', 'day'], school_days, column)
+    _add_counts(BookCirculationTotal, ['book_id'], book_totals, column)
+    _add_counts(SchoolCirculationTotal, ['school'], school_totals, column)
+
+
+def record_borrows(borrowings):
+    """Count new borrowings (with borrow_date set) in the daily rollups"""
+    _record(((b.student_id, b.book_id, b.borrow_date.date()) for b in borrowings), 'borrows')
+
+
+def record_returns(borrowings, returned_at):
+    """Count borrowings returned at returned_at in the daily rollups"""
+    _record(((b.student_id, b.book_id, returned_at.date()) for b in borrowings), 'returns')
+
+
+def forget_borrowings(borrowings):
+    """Remove borrowings that are about to be deleted from the daily rollups"""
+    borrowings = list(borrowings)
+    _record(((b.student_id, b.book_id, b.borrow_date.date()) for b in borrowings), 'borrows', sign=-1)
+    _record(((b.student_id, b.book_id, b.return_date.date()) for b in borrowings if b.return_date),
+            'returns', sign=-1)
+
+
+def change_school(student, school):
+    """Set student.school, moving the student's borrows and returns to the new school's rollups.
+
+    School rollups always credit a student's current school, which is what
+    rebuild() recomputes from the borrowing history.
+    """
+    if school == student.school:
+        return
+    days = {'borrows': Counter(), 'returns': Counter()}
+    for borrow_date, return_date in db.session.query(Borrowing.borrow_date, Borrowing.return_date) \
+            .filter(Borrowing.student_id == student.id):
+        days['borrows'][borrow_date.date()] += 1
+        if return_date:
+            days['returns'][return_date.date()] += 1
+
+    for column, counts in days.items():
+        for target, sign in ((student.school, -1), (school, 1)):
+            _add_counts(SchoolDailyCirculation, ['school', 'day'],
+                        Counter({(target, day): sign * n for day, n in counts.items()}), column)
+            _add_counts(SchoolCirculationTotal, ['school'],
+                        Counter({(target,): sign * sum(counts.values())}), column)
+    student.school = school
+
+
+def _events():
+    borrowed = select(Borrowing.student_id, Borrowing.book_id,
+                      func.date(Borrowing.borrow_date).label('day'),
+                      literal(1).label('borrows'), literal(0).label('returns'))
+    returned = select(Borrowing.student_id, Borrowing.book_id,
+                      func.date(Borrowing.return_date).label('day'),
+                      literal(0).label('borrows'), literal(1).label('returns')) \
+        .where(Borrowing.return_date.isnot(None))
+    return union_all(borrowed, returned).subquery('events')
+
+
+def rebuild():
+    """Recompute every rollup from the borrowing table and commit. Returns (book-day rows, school-day rows)."""
+    events = _events()
+    for model in (BookDailyCirculation, SchoolDailyCirculation, BookCirculationTotal, SchoolCirculationTotal):
+        db.session.execute(model.__table__.delete())
+    db.session.execute(BookDailyCirculation.__table__.insert().from_select(
+        ['book_id', 'day', 'borrows', 'returns'],
+        select(events.c.book_id, events.c.day, func.sum(events.c.borrows), func.sum(events.c.returns))
+        .group_by(events.c.book_id, events.c.day)
+    ))
+    db.session.execute(SchoolDailyCirculation.__table__.insert().from_select(
+        ['school', 'day', 'borrows', 'returns'],
+        select(Student.school, events.c.day, func.sum(events.c.borrows), func.sum(events.c.returns))
+        .join(Student, Student.id == events.c.student_id)
+        .group_by(Student.school, events.c.day)
+    ))
+    for total, daily, key in ((BookCirculationTotal, BookDailyCirculation, 'book_id'),
+                              (SchoolCirculationTotal, SchoolDailyCirculation, 'school')):
+        db.session.execute(total.__table__.insert().from_select(
+            [key, 'borrows', 'returns'],
+            select(daily.__table__.c[key], func.sum(daily.borrows), func.sum(daily.returns))
+            .group_by(daily.__table__.c[key])
+        ))
+    db.session.commit()
+    return (db.session.query(BookDailyCirculation).count(),
+            db.session.query(SchoolDailyCirculation).count())
+
+
+def most_borrowed_books(since=None):
+    """Query of (title, borrow count) for every borrowed book, most borrowed first.
+
+    All-time counts read the per-book totals; with `since` (a date) the
+    daily rollup is summed from that day on.
+    """
+    if since is None:
+        return db.session.query(Book.title, BookCirculationTotal.borrows) \
+            .join(BookCirculationTotal, BookCirculationTotal.book_id == Book.id) \
+            .filter(BookCirculationTotal.borrows > 0) \
+            .order_by(BookCirculationTotal.borrows.desc())
+
+    total = func.sum(BookDailyCirculation.borrows).label('borrow_count')
+    return db.session.query(Book.title, total) \
+        .join(BookDailyCirculation, BookDailyCirculation.book_id == Book.id) \
+        .filter(BookDailyCirculation.day >= since) \
+        .group_by(Book.id).having(total > 0).order_by(total.desc())
+
+
+def borrows_per_school(since=None):
+    """Query of (school, borrow count), busiest school first, optionally from `since` on"""
+    if since is None:
+        return db.session.query(SchoolCirculationTotal.school, SchoolCirculationTotal.borrows) \
+            .filter(SchoolCirculationTotal.borrows > 0) \
+            .order_by(SchoolCirculationTotal.borrows.desc(), SchoolCirculationTotal.school)
+
+    total = func.sum(SchoolDailyCirculation.borrows).label('borrow_count')
+    return db.session.query(SchoolDailyCirculation.school, total) \
+        .filter(SchoolDailyCirculation.day >= since) \
+        .group_by(SchoolDailyCirculation.school).having(total > 0) \
+        .order_by(total.desc(), SchoolDailyCirculation.school)
+
+
+@rollups_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the daily circulation rollups from the full borrowing history."""
+    started = time.perf_counter()
+    book_rows, school_rows = rebuild()
+    click.echo(f'Rebuilt {book_rows} book-day and {school_rows} school-day rows '
+               f'in {time.perf_counter() - started:.1f}s')
@@ -1,10 +1,19 @@
-from flask import Blueprint, render_template, flash, redirect, url_for, request
+from flask import Blueprint, render_template, flash, redirect, url_for, request, current_app, abort, send_file
 from flask_login import login_user, logout_user, login_required, current_user
 from functools import wraps
-from . import db
+from . import db, circulation, openlibrary, rollups
 from .models import Book, Student, Borrowing
 from .forms import BookForm, StudentForm, BorrowForm, LoginForm, SignupForm
-from datetime import datetime
+from .exports import csv_response, YIELD_PER
+from .catalog import import_openlibrary_books, AlreadyInCatalog
+from .search import apply_search
+from .statistics import get_statistics
+from .recommendations import recommend_books
+from .profiling import get_profile_store
+from .tables import Table
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload
 
 def admin_required(f):
     @wraps(f)
@@ -17,6 +26,49 @@ def admin_required(f):
 
 bp = Blueprint('main', __name__)
 
+
+def _book_status_filter(query, status):
+    if status == 'available':
+        return query.filter(Book.available_quantity > 0)
+    if status == 'unavailable':
+        return query.filter(Book.available_quantity == 0)
+    return query
+
+
+def _borrowing_status_filter(query, status):
+    if status == 'overdue':
+        return query.filter(Borrowing.status == 'borrowed', Borrowing.due_date < datetime.utcnow())
+    return query.filter(Borrowing.status == status)
+
+
+BOOKS_TABLE = Table('books', Book, ('book',), sorts={
+    'title': (Book.title, Book.id),
+    'genre': (Book.genre, Book.title, Book.id),
+    'available': (Book.available_quantity, Book.id),
+    'added': (Book.id,),
+}, default_sort='title', filters={
+    'q': lambda query, term: apply_search(query, term, ranked=False),
+    'status': _book_status_filter,
+})
+
+STUDENTS_TABLE = Table('students', Student, ('student',), sorts={
+    'name': (Student.full_name, Student.id),
+    'school': (Student.school, Student.id),
+    'added': (Student.id,),
+}, default_sort='name', filters={
+    'q': lambda query, term: query.filter(db.or_(Student.full_name.contains(term),
+                                                 Student.email.contains(term))),
+    'school': lambda query, school: query.filter(Student.school == school),
+})
+
+BORROWINGS_TABLE = Table('borrowings', Borrowing, ('borrowing',), sorts={
+    'borrowed': (Borrowing.borrow_date, Borrowing.id),
+    'due': (Borrowing.due_date, Borrowing.id),
+}, default_sort='-borrowed', filters={
+    'status': _borrowing_status_filter,
+})
+
+
 @bp.route('/')
 def index():
     return render_template('index.html')
@@ -71,21 +123,19 @@ def logout():
 def dashboard():
     if current_user.is_admin:
         # Admin dashboard with statistics
-        total_books = Book.query.count()
-        available_books_count = Book.query.filter(Book.available_quantity > 0).count()
-        total_students = Student.query.count()
-        active_borrowings = Borrowing.query.filter(Borrowing.status == 'borrowed').count()
-        overdue_books = Borrowing.query.filter(Borrowing.status == 'borrowed', Borrowing.due_date < datetime.utcnow()).count()
+        stats = get_statistics()
 
         # Recent borrowings
-        recent_borrowings = Borrowing.query.order_by(Borrowing.borrow_date.desc()).limit(10).all()
+        recent_borrowings = Borrowing.query \
+            .options(joinedload(Borrowing.student), joinedload(Borrowing.book)) \
+            .order_by(Borrowing.borrow_date.desc()).limit(10).all()
 
         return render_template('admin_dashboard.html',
-                               total_books=total_books,
-                               available_books_count=available_books_count,
-                               total_students=total_students,
-                               active_borrowings=active_borrowings,
-                               overdue_books=overdue_books,
+                               total_books=stats['total_books'],
+                               available_books_count=stats['available_books'],
+                               total_students=stats['total_students'],
+                               active_borrowings=stats['active_borrowings'],
+                               overdue_books=stats['overdue_books'],
                                recent_borrowings=recent_borrowings)
 
     # Student dashboard
@@ -98,10 +148,7 @@ def dashboard():
     # Borrowing history
     history = [b for b in current_user.borrowings if b.status == 'returned']
 
-    from sqlalchemy import func
-    popular_books = db.session.query(Book, func.count(Borrowing.id).label('borrow_count')) \
-        .join(Borrowing).group_by(Book.id).order_by(func.count(Borrowing.id).desc()).limit(5).all()
-    recommendations = [book for book, _ in popular_books]
+    recommendations = recommend_books(current_user.borrowings)
 
     return render_template('student_dashboard.html',
                           available_books=available_books,
@@ -112,14 +159,11 @@ def dashboard():
 @bp.route('/borrow/<int:book_id>', methods=['POST'])
 @login_required
 def borrow_book(book_id):
-    book = Book.query.get_or_404(book_id)
-    if book.available_quantity > 0:
-        borrowing = Borrowing(student_id=current_user.id, book_id=book_id)
-        book.available_quantity -= 1
-        db.session.add(borrowing)
-        db.session.commit()
+    Book.query.get_or_404(book_id)
+    try:
+        circulation.borrow_book(current_user.id, book_id)
         flash('Book borrowed successfully!')
-    else:
+    except circulation.BookUnavailable:
         flash('Book is not available.')
     return redirect(url_for('main.dashboard'))
 
@@ -127,13 +171,13 @@ def borrow_book(book_id):
 @login_required
 def return_borrowing(borrowing_id):
     borrowing = Borrowing.query.get_or_404(borrowing_id)
-    if borrowing.student_id == current_user.id and borrowing.status == 'borrowed':
-        borrowing.return_date = datetime.utcnow()
-        borrowing.status = 'returned'
-        borrowing.book.available_quantity += 1
-        db.session.commit()
+    if borrowing.student_id != current_user.id:
+        flash('Unable to return book.')
+        return redirect(url_for('main.dashboard'))
+    try:
+        circulation.return_book(borrowing)
         flash('Book returned successfully!')
-    else:
+    except circulation.AlreadyReturned:
         flash('Unable to return book.')
     return redirect(url_for('main.dashboard'))
 
@@ -142,12 +186,10 @@ def return_borrowing(borrowing_id):
 @bp.route('/books')
 @admin_required
 def books():
-    books = Book.query.all()
-    total_books = len(books)
-    available_titles = sum(1 for book in books if book.available_quantity > 0)
-    total_copies = sum(book.quantity for book in books)
-    return render_template('books.html', books=books, total_books=total_books, 
-                         available_titles=available_titles, total_copies=total_copies)
+    stats = get_statistics()
+    table = BOOKS_TABLE.paginate(Book.query)
+    return render_template('books.html', table=table, total_books=stats['total_books'],
+                         available_titles=stats['available_books'], total_copies=stats['total_copies'])
 
 @bp.route('/books/add', methods=['GET', 'POST'])
 @admin_required
@@ -202,7 +244,7 @@ def delete_book(id):
 def available_books():
     genre = request.args.get('genre')
     search = request.args.get('search')
-    sort_by = request.args.get('sort', 'title')
+    sort_by = request.args.get('sort', 'relevance' if search else 'title')
 
     query = Book.query.filter(Book.available_quantity > 0)
 
@@ -210,16 +252,11 @@ def available_books():
         query = query.filter(Book.genre == genre)
 
     if search:
-        query = query.filter(
-            db.or_(
-                Book.title.contains(search),
-                Book.author.contains(search)
-            )
-        )
+        query = apply_search(query, search, ranked=(sort_by == 'relevance'))
 
     if sort_by == 'genre':
         query = query.order_by(Book.genre, Book.title)
-    else:
+    elif sort_by != 'relevance' or not search:
         query = query.order_by(Book.title)
 
     books = query.all()
@@ -248,15 +285,27 @@ def borrowing_history():
 @bp.route('/students')
 @admin_required
 def students():
-    students = Student.query.all()
-    total_current = 0
-    total_all = 0
-    for student in students:
-        student.current_borrowed = len([b for b in student.borrowings if b.status == 'borrowed'])
-        student.total_borrowed = len(student.borrowings)
-        total_current += student.current_borrowed
-        total_all += student.total_borrowed
-    return render_template('students.html', students=students, total_current=total_current, total_all=total_all)
+    stats = get_statistics()
+    table = STUDENTS_TABLE.paginate(Student.query)
+
+    # Loan counts for just this page's students, in one GROUP BY
+    current_col = func.count(case((Borrowing.status == 'borrowed', Borrowing.id)))
+    counts = {
+        student_id: (current_borrowed, total_borrowed)
+        for student_id, current_borrowed, total_borrowed in db.session.query(
+            Borrowing.student_id, current_col, func.count(Borrowing.id))
+        .filter(Borrowing.student_id.in_([s.id for s in table.items]))
+        .group_by(Borrowing.student_id)
+    }
+    for student in table.items:
+        student.current_borrowed, student.total_borrowed = counts.get(student.id, (0, 0))
+
+    schools = [school for school, in db.session.query(Student.school).distinct().order_by(Student.school)]
+    return render_template('students.html', table=table, schools=schools,
+                           total_students=stats['total_students'],
+                           total_current=stats['active_borrowings'],
+                           total_all=stats['total_borrowings'],
+                           active_borrowers=stats['active_borrowers'])
 
 @bp.route('/students/add', methods=['GET', 'POST'])
 @admin_required
@@ -281,6 +330,7 @@ def edit_student(id):
     student = Student.query.get_or_404(id)
     form = StudentForm(obj=student)
     if form.validate_on_submit():
+        rollups.change_school(student, form.school.data)
         form.populate_obj(student)
         db.session.commit()
         flash('Student updated successfully!')
@@ -302,6 +352,7 @@ def delete_student(id):
         return redirect(url_for('main.students'))
 
     # Delete
+    rollups.forget_borrowings(student.borrowings)
     Borrowing.query.filter_by(student_id=id).delete()
     db.session.delete(student)
     db.session.commit()
@@ -313,67 +364,59 @@ def delete_student(id):
 @bp.route('/borrow', methods=['GET', 'POST'])
 @admin_required
 def borrow():
-    from datetime import datetime
-    total_borrowings = Borrowing.query.count()
-    available_books_count = Book.query.filter(Book.available_quantity > 0).count()
-    active_borrowings = Borrowing.query.filter(Borrowing.status == 'borrowed').count()
-    overdue_books = Borrowing.query.filter(Borrowing.status == 'borrowed', Borrowing.due_date < datetime.utcnow()).count()
+    stats = get_statistics()
 
     form = BorrowForm()
     form.student_id.choices = [(s.id, s.full_name) for s in Student.query.all()]
     form.book_id.choices = [(b.id, f"{b.title} ({b.available_quantity} available)") for b in Book.query.filter(Book.available_quantity > 0).all()]
     if form.validate_on_submit():
-        book = Book.query.get(form.book_id.data)
-        if book.available_quantity > 0:
-            borrowing = Borrowing(student_id=form.student_id.data, book_id=form.book_id.data)
-            book.available_quantity -= 1
-            db.session.add(borrowing)
-            db.session.commit()
+        try:
+            circulation.borrow_book(form.student_id.data, form.book_id.data)
             flash('Book borrowed successfully!')
             return redirect(url_for('main.borrowings'))
-        else:
+        except circulation.BookUnavailable:
             flash('No copies available!')
     return render_template('borrow.html',
                          form=form,
-                         total_borrowings=total_borrowings,
-                         available_books_count=available_books_count,
-                         active_borrowings=active_borrowings,
-                         overdue_books=overdue_books)
+                         total_borrowings=stats['total_borrowings'],
+                         available_books_count=stats['available_books'],
+                         active_borrowings=stats['active_borrowings'],
+                         overdue_books=stats['overdue_books'])
 
 @bp.route('/borrowings')
 @admin_required
 def borrowings():
-    from datetime import datetime
-    # Order borrowings newest first so latest entries appear at the top
-    borrowings = Borrowing.query.order_by(Borrowing.borrow_date.desc()).all()
-    current_time = datetime.utcnow()
-
-    # Calculate statistics
-    total_borrowings = len(borrowings)
-    active_count = sum(1 for b in borrowings if b.status == 'borrowed')
-    overdue_count = sum(1 for b in borrowings if b.status == 'borrowed' and b.due_date < current_time)
-    returned_count = sum(1 for b in borrowings if b.status == 'returned')
+    stats = get_statistics()
+    table = BORROWINGS_TABLE.paginate(
+        Borrowing.query, options=(joinedload(Borrowing.student), joinedload(Borrowing.book)))
 
     return render_template('borrowings.html',
-                         borrowings=borrowings,
-                         current_time=current_time,
-                         total_borrowings=total_borrowings,
-                         active_count=active_count,
-                         overdue_count=overdue_count,
-                         returned_count=returned_count)
+                         table=table,
+                         current_time=datetime.utcnow(),
+                         total_borrowings=stats['total_borrowings'],
+                         active_count=stats['active_borrowings'],
+                         overdue_count=stats['overdue_books'],
+                         returned_count=stats['total_borrowings'] - stats['active_borrowings'])
 
 @bp.route('/reports')
 @admin_required
 def reports():
-    from sqlalchemy import func
-    from datetime import datetime
-
-    count_col = func.count(Borrowing.id).label('borrow_count')
-    most_borrowed = db.session.query(Book.title, count_col).join(Borrowing).group_by(Book.id).order_by(count_col.desc()).limit(10).all()
-    overdue = Borrowing.query.filter(Borrowing.due_date < datetime.utcnow(), Borrowing.status == 'borrowed').all()
-    books_per_school = db.session.query(Student.school, func.count(Borrowing.id)).join(Borrowing).group_by(Student.school).all()
-
-    return render_template('reports.html', most_borrowed=most_borrowed, overdue=overdue, books_per_school=books_per_school)
+    # Counts come from the circulation rollups, so they don't scan the borrowing history
+    days, since = report_period()
+    most_borrowed = rollups.most_borrowed_books(since).limit(10).all()
+    overdue = Borrowing.query.options(joinedload(Borrowing.student), joinedload(Borrowing.book)) \
+        .filter(Borrowing.due_date < datetime.utcnow(), Borrowing.status == 'borrowed').all()
+    books_per_school = rollups.borrows_per_school(since).all()
+
+    return render_template('reports.html', most_borrowed=most_borrowed, overdue=overdue,
+                           books_per_school=books_per_school, days=days)
+
+def report_period():
+    """Return (days, first day) for a ?days=N report window, or (None, None) for all time"""
+    days = request.args.get('days', type=int)
+    if not days or days < 1:
+        return None, None
+    return days, datetime.utcnow().date() - timedelta(days=days - 1)
 
 @bp.route('/return/<int:id>', methods=['POST'])
 @login_required
@@ -385,13 +428,12 @@ def return_book(id):
             return redirect(url_for('main.borrowings'))
 
         borrowing = Borrowing.query.get_or_404(id)
-        borrowing.return_date = datetime.utcnow()
-        borrowing.status = 'returned'
-        borrowing.book.available_quantity += 1
-        db.session.commit()
+        circulation.return_book(borrowing)
         flash('Book returned successfully!')
+    except circulation.AlreadyReturned as e:
+        flash(str(e))
     except Exception as e:
-        print(f"ERROR returning book: {str(e)}")  # Print to console for debugging
+        current_app.logger.exception('Failed to return borrowing %s', id)
         db.session.rollback()
         flash(f'Failed to mark book as returned: {str(e)}')
     return redirect(url_for('main.borrowings'))
@@ -400,90 +442,49 @@ def return_book(id):
 @bp.route('/export/popular-books/csv')
 @admin_required
 def export_popular_books_csv():
-    from sqlalchemy import func
-    import pandas as pd
-    from flask import Response
-    import io
-
-    # Get most borrowed books data
-    most_borrowed = db.session.query(Book.title, func.count(Borrowing.id).label('borrow_count')) \
-        .join(Borrowing).group_by(Book.id).order_by(func.count(Borrowing.id).desc()).all()
-
-    df = pd.DataFrame(most_borrowed, columns=['Book Title', 'Borrow Count'])
-
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    response = Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=popular_books_report.csv'}
-    )
-
-    return response
+    return csv_response('popular_books_report.csv',
+                        ['Book Title', 'Borrow Count'],
+                        rollups.most_borrowed_books(report_period()[1]).yield_per(YIELD_PER))
 
 @bp.route('/export/school-books/csv')
 @admin_required
 def export_school_books_csv():
-    from sqlalchemy import func
-    import pandas as pd
-    from flask import Response
-    import io
-
-    # Get books per school data
-    books_per_school = db.session.query(Student.school, func.count(Borrowing.id)).join(Borrowing).group_by(Student.school).all()
-
-    # Convert to DataFrame
-    df = pd.DataFrame(books_per_school, columns=['School', 'Total Borrows'])
-
-    # Create CSV in memory
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-
-    # Create response
-    response = Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=school_books_report.csv'}
-    )
-
-    return response
+    return csv_response('school_books_report.csv',
+                        ['School', 'Total Borrows'],
+                        rollups.borrows_per_school(report_period()[1]).yield_per(YIELD_PER))
 
 @bp.route('/export/borrowings/csv')
 @admin_required
 def export_borrowings_csv():
-    import pandas as pd
-    from flask import Response
-    import io
-
-    # Get all borrowings data
-    borrowings = Borrowing.query.all()
-    borrowings_data = []
-
-    for borrowing in borrowings:
-        borrowings_data.append({
-            'Student Name': borrowing.student.full_name,
-            'Book Title': borrowing.book.title,
-            'ISBN': borrowing.book.isbn,
-            'Borrow Date': borrowing.borrow_date.strftime('%Y-%m-%d %H:%M:%S'),
-            'Due Date': borrowing.due_date.strftime('%Y-%m-%d'),
-            'Return Date': borrowing.return_date.strftime('%Y-%m-%d %H:%M:%S') if borrowing.return_date else 'Not Returned',
-            'Status': borrowing.status.title(),
-            'School': borrowing.student.school
-        })
-
-    df = pd.DataFrame(borrowings_data)
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    response = Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=all_borrowings_report.csv'}
+    # One joined query streamed in batches instead of lazy-loading student and book per row
+    borrowings = db.session.query(
+        Student.full_name, Book.title, Book.isbn,
+        Borrowing.borrow_date, Borrowing.due_date, Borrowing.return_date,
+        Borrowing.status, Student.school
+    ).select_from(Borrowing) \
+     .join(Student, Borrowing.student_id == Student.id) \
+     .join(Book, Borrowing.book_id == Book.id) \
+     .order_by(Borrowing.id) \
+     .yield_per(YIELD_PER)
+
+    rows = (
+        (
+            full_name,
+            title,
+            isbn,
+            borrow_date.strftime('%Y-%m-%d %H:%M:%S'),
+            due_date.strftime('%Y-%m-%d'),
+            return_date.strftime('%Y-%m-%d %H:%M:%S') if return_date else 'Not Returned',
+            status.title(),
+            school
+        )
+        for full_name, title, isbn, borrow_date, due_date, return_date, status, school in borrowings
     )
 
-    return response
+    return csv_response('all_borrowings_report.csv',
+                        ['Student Name', 'Book Title', 'ISBN', 'Borrow Date', 'Due Date',
+                         'Return Date', 'Status', 'School'],
+                        rows)
 
 #open lib api
 @bp.route('/search-books')
@@ -494,10 +495,8 @@ def search_books():
 
     if query:
         try:
-            import requests
-            response = requests.get(f'https://openlibrary.org/search.json?q={query}&limit=20')
-            if response.status_code == 200:
-                data = response.json()
+            data = openlibrary.get_client().search(query, limit=20)
+            if data:
                 results = []
                 for doc in data.get('docs', []):
                     book_info = {
@@ -523,61 +522,37 @@ def search_books():
 @admin_required
 def import_book(openlibrary_key):
     try:
-        import requests
-        response = requests.get(f'https://openlibrary.org{openlibrary_key}.json')
-        if response.status_code == 200:
-            data = response.json()
-
-            # Extract book information
-            title = data.get('title', 'Unknown Title')
-            authors = data.get('authors', [])
-            author_names = []
-
-            # Get author names
-            for author_ref in authors:
-                if isinstance(author_ref, dict) and 'key' in author_ref:
-                    author_response = requests.get(f"https://openlibrary.org{author_ref['key']}.json")
-                    if author_response.status_code == 200:
-                        author_data = author_response.json()
-                        author_names.append(author_data.get('name', 'Unknown Author'))
-
-            author = ', '.join(author_names) if author_names else 'Unknown Author'
-
-            # Get ISBN
-            isbns = data.get('isbn_13', []) + data.get('isbn_10', [])
-            isbn = isbns[0] if isbns else None
-
-            # Get genre/subject
-            subjects = data.get('subjects', [])
-            genre = subjects[0] if subjects else 'Unknown'
-
-            # Get publish year
-            publish_date = data.get('publish_date', 'Unknown')
-
-            # Check if book already exists
-            existing_book = Book.query.filter_by(title=title, author=author).first()
-            if existing_book:
-                flash('This book already exists in the library.', 'warning')
-                return redirect(url_for('main.search_books'))
-            
-
-            # Create new book
-            new_book = Book(
-                isbn=isbn,
-                title=title,
-                author=author,
-                genre=genre,
-                quantity=1, 
-                available_quantity=1
-            )
-
-            db.session.add(new_book)
-            db.session.commit()
-
-            flash(f'Successfully imported "{title}" to the library!', 'success')
+        result = import_openlibrary_books([openlibrary_key])[0]
+        if isinstance(result, Book):
+            flash(f'Successfully imported "{result.title}" to the library!', 'success')
+        elif isinstance(result, AlreadyInCatalog):
+            flash(str(result), 'warning')
         else:
-            flash('Failed to retrieve book details from Open Library.', 'error')
+            flash(f'Failed to retrieve book details from Open Library: {result}', 'error')
     except Exception as e:
+        db.session.rollback()
         flash(f'Error importing book: {str(e)}', 'error')
 
-    return redirect(url_for('main.search_books'))
\ No newline at end of file
+    return redirect(url_for('main.search_books'))
+
+#request profiles
+@bp.route('/admin/profiles')
+@admin_required
+def profiles():
+    return render_template('profiles.html', profiles=get_profile_store().list())
+
+@bp.route('/admin/profiles/<profile_id>')
+@admin_required
+def profile_detail(profile_id):
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        abort(404)
+    return render_template('profile_detail.html', profile=profile)
+
+@bp.route('/admin/profiles/<profile_id>/download')
+@admin_required
+def download_profile(profile_id):
+    store = get_profile_store()
+    if store.get(profile_id) is None:
+        abort(404)
+    return send_file(store.prof_path(profile_id), as_attachment=True, download_name=f'{profile_id}.prof')
\ No newline at end of file
@@ -0,0 +1,96 @@
+import re
+from sqlalchemy import DDL, column, event, false, table, text
+from . import db
+from .models import Book
+
+FTS_TABLE = 'book_fts'
+
+# External-content FTS5 index over the book table, kept in sync by triggers.
+# The same statements are issued by migration 8d2e5b7c1a90 for existing databases.
+FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, author, genre, isbn, content='book', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, author, genre, isbn) "
+    "VALUES (new.id, new.title, new.author, new.genre, new.isbn); END",
+    f"CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, genre, isbn) "
+    "VALUES ('delete', old.id, old.title, old.author, old.genre, old.isbn); END",
+    f"CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF title, author, genre, isbn ON book BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, genre, isbn) "
+    "VALUES ('delete', old.id, old.title, old.author, old.genre, old.isbn); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, author, genre, isbn) "
+    "VALUES (new.id, new.title, new.author, new.genre, new.isbn); END",
+]
+
+for statement in FTS_DDL:
+    event.listen(Book.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+event.listen(Book.__table__, 'before_drop',
+             DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect='sqlite'))
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_fts_available = {}
+
+
+def fts_available():
+    """Whether the current engine has the FTS5 book index (checked once per engine)"""
+    engine = db.engine
+    if engine not in _fts_available:
+        available = False
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                available = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first() is not None
+        _fts_available[engine] = available
+    return _fts_available[engine]
+
+
+def build_match_expression(term):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    tokens = _TOKEN_RE.findall(term)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def apply_search(query, term, ranked=True):
+    """Restrict a Book query to rows matching term.
+
+    Uses the FTS5 index (ordered by bm25 rank when ranked is set) on SQLite,
+    and falls back to LIKE matching on title/author on other engines.
+    """
+    if fts_available():
+        match = build_match_expression(term)
+        if not match:
+            return query.filter(false())
+        fts = table(FTS_TABLE, column('rowid'), column('rank'))
+        query = query.join(fts, fts.c.rowid == Book.id) \
+            .filter(text(f'{FTS_TABLE} MATCH :match')).params(match=match)
+        if ranked:
+            query = query.order_by(fts.c.rank)
+        return query
+
+    query = query.filter(
+        db.or_(
+            Book.title.contains(term),
+            Book.author.contains(term)
+        )
+    )
+    if ranked:
+        query = query.order_by(Book.title)
+    return query
+
+
+def search_books(term, available_only=False, limit=20, query=None):
+    """Return up to limit books matching term, best matches first.
+
+    query defaults to Book.query; pass a column-projected query over Book
+    to get rows instead of entities.
+    """
+    if query is None:
+        query = Book.query
+    if available_only:
+        query = query.filter(Book.available_quantity > 0)
+    return apply_search(query, term).limit(limit).all()
@@ -0,0 +1,108 @@
+from datetime import date
+from flask import request
+from . import db
+from .exports import YIELD_PER
+from .models import Book, Student, Borrowing
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names a field the resource does not have"""
+
+
+class Serializer:
+    """Serialize one API resource straight from column-projected rows.
+
+    `fields` maps each public field name to the column it is read from.
+    Queries select only the requested columns (labelled with the field
+    names) instead of whole entities, so no ORM objects are built and
+    related columns such as a borrowing's student name come from a join
+    in the same SELECT. Columns of other models are joined with the
+    onclause given in `joins`, and only when a requested field needs them.
+    """
+
+    def __init__(self, model, fields, joins=None):
+        self.model = model
+        self.fields = fields
+        self.joins = joins or {}
+
+    def requested_fields(self):
+        """Field names from ?fields=a,b (all fields when absent); the id is always included"""
+        raw = request.args.get('fields')
+        if not raw:
+            return list(self.fields)
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+        return ['id'] + [name for name in self.fields if name in names and name != 'id']
+
+    def query(self, fields=None):
+        """A query returning one row of the requested fields per record"""
+        fields = fields or list(self.fields)
+        query = db.session.query(*(self.fields[name].label(name) for name in fields)) \
+            .select_from(self.model)
+        needed = {self.fields[name].class_ for name in fields}
+        for model, onclause in self.joins.items():
+            if model in needed:
+                query = query.join(model, onclause)
+        return query
+
+    def get(self, id_, fields=None):
+        """The serialized record with this id, or None"""
+        row = self.query(fields).filter(self.model.id == id_).first()
+        return self.dump(row) if row is not None else None
+
+    def get_many(self, ids, fields=None):
+        """Serialized records for ids, keyed by id, in one query"""
+        if not ids:
+            return {}
+        rows = self.query(fields).filter(self.model.id.in_(set(ids)))
+        return {row.id: self.dump(row) for row in rows}
+
+    def iter_dump(self, query, after=None):
+        """Lazily serialize every row of query in id order (after `after`), YIELD_PER rows at a time"""
+        if after is not None:
+            query = query.filter(self.model.id > after)
+        for row in query.order_by(self.model.id).yield_per(YIELD_PER):
+            yield self.dump(row)
+
+    @staticmethod
+    def dump(row):
+        return {name: value.isoformat() if isinstance(value, date) else value
+                for name, value in zip(row._fields, row)}
+
+
+BOOK = Serializer(Book, {
+    'id': Book.id,
+    'isbn': Book.isbn,
+    'title': Book.title,
+    'author': Book.author,
+    'genre': Book.genre,
+    'quantity': Book.quantity,
+    'available_quantity': Book.available_quantity,
+})
+
+STUDENT = Serializer(Student, {
+    'id': Student.id,
+    'email': Student.email,
+    'full_name': Student.full_name,
+    'class_name': Student.class_name,
+    'school': Student.school,
+    'contact': Student.contact,
+    'is_admin': Student.is_admin,
+})
+
+BORROWING = Serializer(Borrowing, {
+    'id': Borrowing.id,
+    'student_id': Borrowing.student_id,
+    'student_name': Student.full_name,
+    'book_id': Borrowing.book_id,
+    'book_title': Book.title,
+    'borrow_date': Borrowing.borrow_date,
+    'due_date': Borrowing.due_date,
+    'return_date': Borrowing.return_date,
+    'status': Borrowing.status,
+}, joins={
+    Student: Student.id == Borrowing.student_id,
+    Book: Book.id == Borrowing.book_id,
+})
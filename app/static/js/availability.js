@@ -0,0 +1,20 @@
+// Keeps copy counts and borrow buttons current from /api/stream/availability.
+// Only loaded on pages opened with ?live=1 (kiosks), since every open
+// stream holds a server thread.
+// Elements opt in with data-available-book="<id>" (text set to the count)
+// and data-borrow-book="<id>" (disabled while no copies are left).
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+    var source = new EventSource(document.currentScript.dataset.stream);
+    source.onmessage = function (event) {
+        var change = JSON.parse(event.data);
+        document.querySelectorAll('[data-available-book="' + change.book_id + '"]').forEach(function (element) {
+            element.textContent = change.available_quantity;
+        });
+        document.querySelectorAll('[data-borrow-book="' + change.book_id + '"]').forEach(function (button) {
+            button.disabled = change.available_quantity === 0;
+        });
+    };
+})();
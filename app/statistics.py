@@ -0,0 +1,72 @@
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import case, func
+from . import db, changes
+from .cache import TTLCache
+from .models import Book, Student, Borrowing
+
+DEFAULT_TTL = 30
+_CACHE_KEY = 'library'
+
+
+def _get_cache():
+    cache = current_app.extensions.get('statistics_cache')
+    if cache is None:
+        ttl = current_app.config.get('STATISTICS_CACHE_TTL', DEFAULT_TTL)
+        cache = current_app.extensions['statistics_cache'] = TTLCache(maxsize=1, ttl=ttl)
+    return cache
+
+
+def compute_statistics():
+    """Compute every library counter in a single SELECT"""
+    now = datetime.utcnow()
+
+    book_totals = db.session.query(
+        func.count(Book.id).label('total_books'),
+        func.coalesce(func.sum(Book.quantity), 0).label('total_copies'),
+        func.count(case((Book.available_quantity > 0, Book.id))).label('available_books')
+    ).subquery()
+
+    total_students = db.session.query(func.count(Student.id)).scalar_subquery()
+    total_borrowings = db.session.query(func.count(Borrowing.id)).scalar_subquery()
+    active_borrowings = db.session.query(func.count(Borrowing.id)) \
+        .filter(Borrowing.status == 'borrowed').scalar_subquery()
+    overdue_books = db.session.query(func.count(Borrowing.id)) \
+        .filter(Borrowing.status == 'borrowed', Borrowing.due_date < now).scalar_subquery()
+    active_borrowers = db.session.query(func.count(func.distinct(Borrowing.student_id))) \
+        .filter(Borrowing.status == 'borrowed').scalar_subquery()
+
+    row = db.session.query(
+        book_totals.c.total_books,
+        book_totals.c.total_copies,
+        book_totals.c.available_books,
+        total_students.label('total_students'),
+        total_borrowings.label('total_borrowings'),
+        active_borrowings.label('active_borrowings'),
+        overdue_books.label('overdue_books'),
+        active_borrowers.label('active_borrowers')
+    ).one()
+
+    return dict(row._mapping)
+
+
+def get_statistics():
+    """Return the library counters, served from a short-lived cache"""
+    cache = _get_cache()
+    stats = cache.get(_CACHE_KEY)
+    if stats is None:
+        stats = compute_statistics()
+        cache.set(_CACHE_KEY, stats)
+    return stats
+
+
+def invalidate_statistics():
+    if has_app_context():
+        _get_cache().pop(_CACHE_KEY)
+
+
+@changes.on_commit
+def _invalidate_on_commit(tables):
+    # Any committed change to books, students or borrowings makes the counters stale
+    if tables & {'book', 'student', 'borrowing'}:
+        invalidate_statistics()
@@ -0,0 +1,136 @@
+import math
+from flask import current_app, request, url_for
+from sqlalchemy import func
+from .cache import TTLCache
+from .versioning import table_versions
+
+PAGE_SIZES = (25, 50, 100)
+DEFAULT_PAGE_SIZE = 25
+DEFAULT_COUNT_CACHE_TTL = 60
+
+
+def _get_count_cache():
+    cache = current_app.extensions.get('table_counts')
+    if cache is None:
+        cache = current_app.extensions['table_counts'] = TTLCache(
+            maxsize=512, ttl=current_app.config.get('TABLE_COUNT_CACHE_TTL', DEFAULT_COUNT_CACHE_TTL))
+    return cache
+
+
+class Table:
+    """A server-side paginated, sortable and filterable listing for an admin page.
+
+    Reads ?page=, ?size=, ?sort= and one query parameter per filter.
+    `sorts` maps each sort key to the columns it orders by (each should be
+    backed by an index, ending in the primary key so pages are stable);
+    ?sort=-key reverses it. `filters` maps a parameter name to a function
+    that narrows the query for a non-empty value. The total row count is
+    cached per filter combination; the cache key includes the data versions
+    of `tables`, so any commit to them recounts, and entries also expire
+    after TABLE_COUNT_CACHE_TTL seconds for changes made by the clock
+    (overdue filters).
+    """
+
+    def __init__(self, name, model, tables, sorts, default_sort, filters=None):
+        self.name = name
+        self.model = model
+        self.tables = tables
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.filters = filters or {}
+
+    def count(self, query, filters):
+        key = (self.name, tuple(sorted(filters.items())), table_versions(self.tables))
+        cache = _get_count_cache()
+        total = cache.get(key)
+        if total is None:
+            total = query.order_by(None).with_entities(func.count(self.model.id)).scalar()
+            cache.set(key, total)
+        return total
+
+    def paginate(self, query, options=()):
+        """Filter, count, sort and slice query according to the request args.
+
+        Loader options (e.g. joinedload) are applied to the page query only.
+        """
+        args = request.args
+        filters = {}
+        for name, apply in self.filters.items():
+            value = args.get(name, '').strip()
+            if value:
+                filters[name] = value
+                query = apply(query, value)
+
+        sort = args.get('sort', self.default_sort)
+        if sort.lstrip('-') not in self.sorts:
+            sort = self.default_sort
+        descending = sort.startswith('-')
+        order_by = [column.desc() if descending else column for column in self.sorts[sort.lstrip('-')]]
+
+        size = args.get('size', DEFAULT_PAGE_SIZE, type=int)
+        if size not in PAGE_SIZES:
+            size = DEFAULT_PAGE_SIZE
+        total = self.count(query, filters)
+        pages = max(1, math.ceil(total / size))
+        page = min(max(args.get('page', 1, type=int) or 1, 1), pages)
+
+        items = query.options(*options).order_by(*order_by) \
+            .limit(size).offset((page - 1) * size).all()
+        return TablePage(items, page, size, total, sort, filters)
+
+
+class TablePage:
+    """One page of a Table, with helpers for building sort and page links"""
+
+    def __init__(self, items, page, size, total, sort, filters):
+        self.items = items
+        self.page = page
+        self.size = size
+        self.total = total
+        self.sort = sort
+        self.filters = filters
+        self.pages = max(1, math.ceil(total / size))
+        self.sizes = PAGE_SIZES
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def first_index(self):
+        return (self.page - 1) * self.size + 1 if self.total else 0
+
+    @property
+    def last_index(self):
+        return min(self.page * self.size, self.total)
+
+    def url(self, **changes):
+        """URL of this listing with some parameters changed (None removes one)"""
+        args = {**self.filters, 'sort': self.sort, 'size': self.size, 'page': self.page, **changes}
+        return url_for(request.endpoint, **{k: v for k, v in args.items() if v is not None},
+                       **request.view_args)
+
+    def sort_url(self, key):
+        """Link that sorts on key, toggling direction when it is already the sort"""
+        return self.url(sort=f'-{key}' if self.sort == key else key, page=None)
+
+    def sort_direction(self, key):
+        if self.sort == key:
+            return 'asc'
+        if self.sort == f'-{key}':
+            return 'desc'
+        return None
+
+    def page_numbers(self, around=2):
+        """Page numbers to link to, with None marking a gap"""
+        shown = {1, self.pages, *range(self.page - around, self.page + around + 1)}
+        numbers = []
+        for number in sorted(n for n in shown if 1 <= n <= self.pages):
+            if numbers and number != numbers[-1] + 1:
+                numbers.append(None)
+            numbers.append(number)
+        return numbers
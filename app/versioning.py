@@ -0,0 +1,123 @@
+import hashlib
+import time
+from functools import wraps
+from flask import make_response, request
+from sqlalchemy import DDL, event, update
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from werkzeug.http import http_date
+from . import db, changes
+from .models import Book, Student, Borrowing, DataVersion
+
+VERSIONED_TABLES = ('book', 'student', 'borrowing')
+
+# Every row written to a versioned table bumps its data_version row in the
+# same transaction, whichever process or connection made the change.
+# The same statements are issued by migration a9c3e5f71d28 for existing databases.
+_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+VERSION_TRIGGER_DDL = {
+    table: [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix} AFTER {operation} ON {table} BEGIN "
+        f"UPDATE data_version SET version = version + 1, modified_at = {_NOW} "
+        f"WHERE table_name = '{table}'; END"
+        for suffix, operation in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))
+    ]
+    for table in VERSIONED_TABLES
+}
+_versioning_available = {}
+
+for model in (Book, Student, Borrowing):
+    for statement in VERSION_TRIGGER_DDL[model.__tablename__]:
+        event.listen(model.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+
+@event.listens_for(DataVersion.__table__, 'after_create')
+def _seed_versions(target, connection, **kw):
+    now = time.time()
+    connection.execute(target.insert(), [{'table_name': table, 'version': 0, 'modified_at': now}
+                                         for table in VERSIONED_TABLES])
+
+
+@changes.on_commit
+def _bump_versions(tables):
+    # SQLite databases are kept current by the triggers; other engines only
+    # see the changes this app commits, bumped right after the commit
+    tables = [table for table in VERSIONED_TABLES if table in tables]
+    if not tables or db.engine.dialect.name == 'sqlite':
+        return
+    with db.engine.begin() as conn:
+        conn.execute(update(DataVersion)
+                     .where(DataVersion.table_name.in_(tables))
+                     .values(version=DataVersion.version + 1, modified_at=time.time()))
+
+
+def table_versions(tables):
+    """(version, modified_at) of each table from the data_version table, in one query.
+
+    Returns None on a database that predates the versioning migration (no
+    data_version table, or no row for one of the tables), since nothing
+    would ever bump it; callers then skip validation and caching by version.
+    A missing table is remembered per engine, like search.fts_available().
+    """
+    engine = db.engine
+    if not _versioning_available.get(engine, True):
+        return None
+    try:
+        rows = db.session.query(DataVersion.table_name, DataVersion.version, DataVersion.modified_at) \
+            .filter(DataVersion.table_name.in_(tables)).all()
+    except (OperationalError, ProgrammingError):
+        # Roll back the failed statement so the request can go on to query
+        # (PostgreSQL aborts the transaction after an error)
+        db.session.rollback()
+        _versioning_available[engine] = False
+        return None
+    found = {row.table_name: (row.version, row.modified_at) for row in rows}
+    if len(found) < len(set(tables)):
+        return None
+    return tuple(found[table] for table in tables)
+
+
+def conditional(*tables, refresh_seconds=None):
+    """Serve GET responses with a strong ETag and Last-Modified derived from table versions.
+
+    The versions are read from the database, so every worker computes the
+    same tag and sees changes committed by any process. A matching
+    If-None-Match (or, without one, a fresh If-Modified-Since) gets a 304
+    after that single lookup, before the view runs. refresh_seconds forces
+    a new tag every that many seconds for views whose output also depends
+    on the clock, such as overdue counts.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            versions = table_versions(tables)
+            if versions is None:
+                return f(*args, **kwargs)
+
+            parts = [request.full_path, request.headers.get('Accept', ''),
+                     *(f'{version}:{modified_at!r}' for version, modified_at in versions)]
+            if refresh_seconds:
+                parts.append(str(int(time.time() // refresh_seconds)))
+            etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+            last_modified = int(max(modified_at for version, modified_at in versions))
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = (since is not None and not refresh_seconds
+                                and last_modified <= since.timestamp())
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Last-Modified'] = http_date(last_modified)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.vary.add('Accept')
+            return response
+        return decorated_function
+    return decorator
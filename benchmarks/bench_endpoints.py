@@ -0,0 +1,206 @@
+"""Measure latency, query count and memory of the main pages and API endpoints.
+
+Requests go through the Flask test client against a database built by
+generate_dataset.py, so the numbers cover the app and database but not
+the network. Each endpoint is warmed up and then requested --iterations
+times. Results are printed and written to JSON. Pass --baseline with an
+earlier results file to show the change per endpoint, e.g. a run with
+--no-user-cache to see what the identity cache saves per request.
+
+Requests send `Accept-Encoding: br, gzip` by default, and each endpoint
+reports both the decoded body size and the bytes actually sent, so the
+"saved" column is the bandwidth response compression saves. Use
+--accept-encoding identity for uncompressed runs.
+
+    python benchmarks/generate_dataset.py --preset medium --output /tmp/library_medium.db
+    python benchmarks/bench_endpoints.py --database /tmp/library_medium.db --output results.json
+    python benchmarks/bench_endpoints.py --database /tmp/library_medium.db --baseline results.json
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.compression import brotli
+from app.models import Book, Student, Borrowing
+
+ENDPOINTS = [
+    '/dashboard',
+    '/books',
+    '/available_books?search=river',
+    '/students',
+    '/borrowings',
+    '/reports',
+    '/api/books',
+    '/api/books/search?q=river',
+    '/api/students',
+    '/api/borrowings',
+    '/api/borrowings?status=borrowed',
+    '/api/borrowings?format=ndjson',
+    '/api/statistics',
+    '/export/popular-books/csv',
+    '/export/school-books/csv',
+    '/export/borrowings/csv',
+]
+# Full exports scale with the dataset, so fewer runs
+SLOW_ENDPOINTS = {'/export/borrowings/csv', '/api/borrowings?format=ndjson'}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def decoded_size(response, body):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return len(gzip.decompress(body))
+    if encoding == 'br':
+        return len(brotli.decompress(body))
+    return len(body)
+
+
+def measure(client, url, iterations, warmup, counter, headers=None):
+    for _ in range(warmup):
+        client.get(url, headers=headers).get_data()
+
+    timings, queries = [], []
+    size = wire_size = status = None
+    for _ in range(iterations):
+        counter['queries'] = 0
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        body = response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter['queries'])
+        size, wire_size, status = decoded_size(response, body), len(body), response.status_code
+
+    return {
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'queries': max(queries),
+        'bytes': size,
+        'wire_bytes': wire_size,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def print_results(results, baseline=None):
+    previous = (baseline or {}).get('endpoints', {})
+    print(f"{'endpoint':<36} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'bytes':>11} "
+          f"{'wire':>11} {'saved':>6} {'rss MB':>7}")
+    for url, result in results['endpoints'].items():
+        size, wire = result['bytes'], result.get('wire_bytes', result['bytes'])
+        saved = (1 - wire / size) * 100 if size else 0
+        line = (f"{url:<36} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['queries']:>8} {size:>11,} {wire:>11,} {saved:>5.0f}% "
+                f"{result['peak_rss_kb'] / 1024:>7.0f}")
+        before = previous.get(url)
+        if before and before['p50_ms']:
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+            line += f"  p50 {change:+.0f}%, queries {before['queries']} -> {result['queries']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='benchmarks/library_bench.db',
+                        help='SQLite file created by generate_dataset.py')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--slow-iterations', type=int, default=5,
+                        help='Runs for full exports and unpaginated pages.')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--endpoint', action='append', dest='endpoints',
+                        help='Only benchmark this URL (repeatable).')
+    parser.add_argument('--no-user-cache', action='store_true',
+                        help='Look the logged-in user up on every request (USER_CACHE_TTL=0).')
+    parser.add_argument('--accept-encoding', default='br, gzip',
+                        help='Accept-Encoding header to send (default: %(default)s).')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.database)
+    if not os.path.exists(path):
+        parser.error(f'{path} does not exist; create it with benchmarks/generate_dataset.py')
+
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'WTF_CSRF_ENABLED': False}
+    if args.no_user_cache:
+        config['USER_CACHE_TTL'] = 0
+    app = create_app(config)
+    counter = {'queries': 0}
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            counter['queries'] += 1
+
+        dataset = {
+            'books': db.session.query(Book).count(),
+            'students': db.session.query(Student).count(),
+            'borrowings': db.session.query(Borrowing).count(),
+        }
+
+    client = app.test_client()
+    login = client.post('/login', data={'email': 'admin@edulib.com', 'password': 'admin123'})
+    if login.status_code != 302:
+        sys.exit('Could not log in as admin@edulib.com; was the database made by generate_dataset.py?')
+
+    results = {
+        'meta': {
+            'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'database': path,
+            'dataset': dataset,
+            'user_cache': not args.no_user_cache,
+            'accept_encoding': args.accept_encoding,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'endpoints': {},
+    }
+    for url in args.endpoints or ENDPOINTS:
+        slow = url in SLOW_ENDPOINTS or url.split('?')[0] in SLOW_ENDPOINTS
+        iterations = args.slow_iterations if slow else args.iterations
+        results['endpoints'][url] = measure(client, url, iterations, args.warmup, counter,
+                                            headers={'Accept-Encoding': args.accept_encoding})
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(f"Dataset: {dataset['books']:,} books, {dataset['students']:,} students, "
+          f"{dataset['borrowings']:,} borrowings")
+    print_results(results, baseline)
+    total = sum(result['bytes'] for result in results['endpoints'].values())
+    wire = sum(result['wire_bytes'] for result in results['endpoints'].values())
+    if total:
+        print(f'Compression: {wire:,} of {total:,} bytes sent ({(1 - wire / total) * 100:.0f}% saved)')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Compare SQLite throughput with and without the production pragma profile.
+
+Runs reader threads (statistics aggregate + a page of borrowings) and
+writer threads (borrow then return through the circulation service)
+against a fresh file database, once with SQLite defaults and once with
+app.database.DEFAULT_SQLITE_PRAGMAS, and prints ops/sec and lock errors.
+
+    python benchmarks/bench_sqlite_profile.py --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from app import create_app, db, circulation
+from app.database import DEFAULT_SQLITE_PRAGMAS
+from app.models import Book, Student, Borrowing
+from app.statistics import compute_statistics
+
+
+def seed(app, books, students, borrowings):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Book.__table__.insert(), [
+            {'isbn': f'{i:013d}', 'title': f'Title {i}', 'author': f'Author {i % 500}',
+             'genre': f'Genre {i % 20}', 'quantity': 1000, 'available_quantity': 1000}
+            for i in range(books)
+        ])
+        db.session.execute(Student.__table__.insert(), [
+            {'email': f'student{i}@example.com', 'full_name': f'Student {i}',
+             'class_name': '10A', 'school': f'School {i % 10}', 'is_admin': False}
+            for i in range(students)
+        ])
+        db.session.commit()
+        for start in range(0, borrowings, 5000):
+            db.session.add_all([
+                Borrowing(student_id=i % students + 1, book_id=i % books + 1)
+                for i in range(start, min(start + 5000, borrowings))
+            ])
+            db.session.commit()
+
+
+def run_profile(name, pragmas, args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLITE_PRAGMAS': pragmas,
+    })
+    seed(app, args.books, args.students, args.borrowings)
+
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def reader():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    compute_statistics()
+                    Borrowing.query.order_by(Borrowing.id.desc()).limit(50).all()
+                    key = 'reads'
+                except OperationalError:
+                    key = 'locked'
+                db.session.rollback()
+                with lock:
+                    counts[key] += 1
+
+    def writer(worker):
+        with app.app_context():
+            i = worker
+            while not stop.is_set():
+                try:
+                    borrowing = circulation.borrow_book(i % args.students + 1, i % args.books + 1)
+                    circulation.return_book(borrowing)
+                    key = 'writes'
+                except OperationalError:
+                    db.session.rollback()
+                    key = 'locked'
+                with lock:
+                    counts[key] += 1
+                i += args.writers
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    print(f"{name:<8} reads/s {counts['reads'] / args.seconds:>9.1f}   "
+          f"writes/s {counts['writes'] / args.seconds:>8.1f}   "
+          f"locked errors {counts['locked']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--borrowings', type=int, default=50000)
+    args = parser.parse_args()
+
+    run_profile('default', {}, args)
+    run_profile('tuned', DEFAULT_SQLITE_PRAGMAS, args)
+
+
+if __name__ == '__main__':
+    main()
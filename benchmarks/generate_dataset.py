@@ -0,0 +1,172 @@
+"""Generate a synthetic library database at realistic consortium sizes.
+
+Books, students and borrowings are written with chunked executemany inserts.
+Borrowings span the last few years. Most are returned. A configurable share
+is still out, and some of those are overdue. Stock levels stay consistent
+with the active loans. An admin account (admin@edulib.com / admin123) is
+included so the benchmark suite can log in.
+
+    python benchmarks/generate_dataset.py --preset large --output /tmp/library_large.db
+    python benchmarks/generate_dataset.py --books 20000 --students 5000 --borrowings 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db, rollups
+from app.models import Book, Student, Borrowing
+
+PRESETS = {
+    'small': {'books': 2000, 'students': 500, 'borrowings': 20000},
+    'medium': {'books': 20000, 'students': 5000, 'borrowings': 200000},
+    'large': {'books': 200000, 'students': 50000, 'borrowings': 2000000},
+}
+
+GENRES = ['Fiction', 'Fantasy', 'Mystery', 'Romance', 'Dystopian', 'Classic', 'Academic',
+          'Thriller', 'Adventure', 'Filipino / Fiction', 'Filipino / History', 'Wattpad / Romance']
+SCHOOLS = [f'EduLib School {i}' for i in range(1, 26)]
+WORDS = ['River', 'Shadow', 'Garden', 'Light', 'Stone', 'Winter', 'Island', 'Secret', 'Fire',
+         'Dream', 'City', 'Storm', 'Bridge', 'Mirror', 'Song', 'Forest', 'Ocean', 'Crown']
+CHUNK_SIZE = 20000
+
+
+def chunked_insert(table, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    quantities = [rng.randint(1, 10) for _ in range(args.books)]
+
+    def borrowing_rows(active_per_book):
+        # A private generator keeps the sequence identical across passes
+        loan_rng = random.Random(args.seed + 1)
+        for _ in range(args.borrowings):
+            student_id = loan_rng.randint(2, args.students + 1)
+            # Skew demand so a minority of titles gets most of the loans
+            rank = int(args.books * loan_rng.random() ** 3)
+            book_index = rank * 7919 % args.books
+
+            active = (loan_rng.random() < args.active_ratio
+                      and active_per_book[book_index] < quantities[book_index])
+            if active:
+                active_per_book[book_index] += 1
+                overdue = loan_rng.random() < args.overdue_ratio
+                age = loan_rng.randint(15, 60) if overdue else loan_rng.randint(0, 13)
+                borrow_date = now - timedelta(days=age, seconds=loan_rng.randint(0, 86399))
+                return_date = None
+                status = 'borrowed'
+            else:
+                borrow_date = now - timedelta(days=loan_rng.randint(15, 3 * 365),
+                                              seconds=loan_rng.randint(0, 86399))
+                return_date = borrow_date + timedelta(days=loan_rng.randint(1, 30))
+                status = 'returned'
+            yield {
+                'student_id': student_id,
+                'book_id': book_index + 1,
+                'borrow_date': borrow_date,
+                'due_date': borrow_date + timedelta(days=14),
+                'return_date': return_date,
+                'status': status,
+            }
+
+    # First pass only settles how many copies of each book are out
+    active_per_book = [0] * args.books
+    for _ in borrowing_rows(active_per_book):
+        pass
+
+    def book_rows():
+        for i in range(args.books):
+            title = ' '.join(rng.sample(WORDS, rng.randint(2, 4)))
+            yield {
+                'isbn': f'979{i:010d}',
+                'title': f'{title} {i}',
+                'author': f'{rng.choice(WORDS)} {rng.choice(WORDS)}son {i % 5000}',
+                'genre': rng.choice(GENRES),
+                'quantity': quantities[i],
+                'available_quantity': quantities[i] - active_per_book[i],
+            }
+
+    def student_rows():
+        admin = Student(email='admin@edulib.com', full_name='Admin', class_name='Staff',
+                        school=SCHOOLS[0], is_admin=True)
+        admin.set_password('admin123')
+        yield {'email': admin.email, 'password_hash': admin.password_hash, 'full_name': admin.full_name,
+               'class_name': admin.class_name, 'school': admin.school, 'contact': None, 'is_admin': True}
+        for i in range(args.students):
+            yield {
+                'email': f'student{i}@edulib.test',
+                'password_hash': None,
+                'full_name': f'Student {i}',
+                'class_name': f'Grade {rng.randint(7, 12)}-{rng.choice("ABCD")}',
+                'school': rng.choice(SCHOOLS),
+                'contact': None,
+                'is_admin': False,
+            }
+
+    timings = {}
+    for name, table, rows in (('students', Student.__table__, student_rows()),
+                              ('books', Book.__table__, book_rows()),
+                              ('borrowings', Borrowing.__table__, borrowing_rows([0] * args.books))):
+        started = time.perf_counter()
+        chunked_insert(table, rows)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--books', type=int)
+    parser.add_argument('--students', type=int)
+    parser.add_argument('--borrowings', type=int)
+    parser.add_argument('--active-ratio', type=float, default=0.05,
+                        help='Share of borrowings still out (capped by stock).')
+    parser.add_argument('--overdue-ratio', type=float, default=0.3,
+                        help='Share of active borrowings that are overdue.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmarks/library_bench.db')
+    args = parser.parse_args()
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    path = os.path.abspath(args.output)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        db.create_all()
+        timings = generate(args)
+        started = time.perf_counter()
+        rollups.rebuild()
+        rollup_seconds = time.perf_counter() - started
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    for table, seconds in timings.items():
+        count = args.students + 1 if table == 'students' else getattr(args, table)
+        print(f'{table:<11} {count:>9,} rows in {seconds:6.1f}s ({count / seconds:,.0f} rows/sec)')
+    print(f'rollups     rebuilt in {rollup_seconds:6.1f}s')
+    print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
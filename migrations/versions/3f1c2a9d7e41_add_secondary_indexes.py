@@ -0,0 +1,47 @@
+"""Add secondary indexes for dashboard, report and catalog queries
+
+Revision ID: 3f1c2a9d7e41
+Revises: b4622e020b76
+Create Date: 2026-10-16 09:12:44.518203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7e41'
+down_revision = 'b4622e020b76'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.create_index('ix_book_genre_title', ['genre', 'title'], unique=False)
+        batch_op.create_index(batch_op.f('ix_book_title'), ['title'], unique=False)
+        batch_op.create_index(batch_op.f('ix_book_available_quantity'), ['available_quantity'], unique=False)
+
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_student_school'), ['school'], unique=False)
+
+    with op.batch_alter_table('borrowing', schema=None) as batch_op:
+        batch_op.create_index('ix_borrowing_status_due_date', ['status', 'due_date'], unique=False)
+        batch_op.create_index('ix_borrowing_student_id_status', ['student_id', 'status'], unique=False)
+        batch_op.create_index('ix_borrowing_book_id_status', ['book_id', 'status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_borrowing_borrow_date'), ['borrow_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('borrowing', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_borrowing_borrow_date'))
+        batch_op.drop_index('ix_borrowing_book_id_status')
+        batch_op.drop_index('ix_borrowing_student_id_status')
+        batch_op.drop_index('ix_borrowing_status_due_date')
+
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_student_school'))
+
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_book_available_quantity'))
+        batch_op.drop_index(batch_op.f('ix_book_title'))
+        batch_op.drop_index('ix_book_genre_title')
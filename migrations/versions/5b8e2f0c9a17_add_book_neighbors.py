@@ -0,0 +1,31 @@
+"""Add the precomputed book neighbor table for recommendations
+
+Revision ID: 5b8e2f0c9a17
+Revises: e31d9a4c6b58
+Create Date: 2026-10-16 17:12:48.503921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2f0c9a17'
+down_revision = 'e31d9a4c6b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('book_neighbor',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('neighbor_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['book.id'], ),
+    sa.ForeignKeyConstraint(['neighbor_id'], ['book.id'], ),
+    sa.PrimaryKeyConstraint('book_id', 'neighbor_id')
+    )
+
+
+def downgrade():
+    op.drop_table('book_neighbor')
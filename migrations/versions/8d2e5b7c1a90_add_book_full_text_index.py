@@ -0,0 +1,55 @@
+"""Add FTS5 full-text index over the book catalog
+
+Revision ID: 8d2e5b7c1a90
+Revises: 3f1c2a9d7e41
+Create Date: 2026-10-16 10:41:03.772910
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e5b7c1a90'
+down_revision = '3f1c2a9d7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other engines use the LIKE fallback in app/search.py
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE book_fts USING fts5("
+        "title, author, genre, isbn, content='book', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER book_fts_ai AFTER INSERT ON book BEGIN "
+        "INSERT INTO book_fts(rowid, title, author, genre, isbn) "
+        "VALUES (new.id, new.title, new.author, new.genre, new.isbn); END"
+    )
+    op.execute(
+        "CREATE TRIGGER book_fts_ad AFTER DELETE ON book BEGIN "
+        "INSERT INTO book_fts(book_fts, rowid, title, author, genre, isbn) "
+        "VALUES ('delete', old.id, old.title, old.author, old.genre, old.isbn); END"
+    )
+    op.execute(
+        "CREATE TRIGGER book_fts_au AFTER UPDATE OF title, author, genre, isbn ON book BEGIN "
+        "INSERT INTO book_fts(book_fts, rowid, title, author, genre, isbn) "
+        "VALUES ('delete', old.id, old.title, old.author, old.genre, old.isbn); "
+        "INSERT INTO book_fts(rowid, title, author, genre, isbn) "
+        "VALUES (new.id, new.title, new.author, new.genre, new.isbn); END"
+    )
+    op.execute("INSERT INTO book_fts(book_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS book_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ai")
+    op.execute("DROP TABLE IF EXISTS book_fts")
@@ -0,0 +1,55 @@
+"""Add the data_version table and the triggers that bump it
+
+Revision ID: a9c3e5f71d28
+Revises: 5b8e2f0c9a17
+Create Date: 2026-10-17 09:26:14.880412
+
+"""
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e5f71d28'
+down_revision = '5b8e2f0c9a17'
+branch_labels = None
+depends_on = None
+
+TABLES = ('book', 'student', 'borrowing')
+OPERATIONS = (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))
+
+
+def upgrade():
+    data_version = op.create_table('data_version',
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('modified_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    now = time.time()
+    op.bulk_insert(data_version, [{'table_name': table, 'version': 0, 'modified_at': now}
+                                  for table in TABLES])
+
+    # Other engines are bumped by the app after each commit (app/versioning.py)
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table in TABLES:
+        for suffix, operation in OPERATIONS:
+            op.execute(
+                f"CREATE TRIGGER {table}_version_{suffix} AFTER {operation} ON {table} BEGIN "
+                "UPDATE data_version SET version = version + 1, "
+                "modified_at = (julianday('now') - 2440587.5) * 86400.0 "
+                f"WHERE table_name = '{table}'; END"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            for suffix, operation in OPERATIONS:
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{suffix}")
+
+    op.drop_table('data_version')
@@ -0,0 +1,100 @@
+"""Add daily and all-time circulation rollups per book and per school
+
+Revision ID: c7a4e19b2f63
+Revises: 8d2e5b7c1a90
+Create Date: 2026-10-16 15:02:37.190455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a4e19b2f63'
+down_revision = '8d2e5b7c1a90'
+branch_labels = None
+depends_on = None
+
+EVENTS = (
+    "SELECT student_id, book_id, DATE(borrow_date) AS day, 1 AS borrows, 0 AS returns FROM borrowing "
+    "UNION ALL "
+    "SELECT student_id, book_id, DATE(return_date) AS day, 0 AS borrows, 1 AS returns FROM borrowing "
+    "WHERE return_date IS NOT NULL"
+)
+
+
+def upgrade():
+    op.create_table('book_daily_circulation',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('borrows', sa.Integer(), nullable=False),
+    sa.Column('returns', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['book.id'], ),
+    sa.PrimaryKeyConstraint('book_id', 'day')
+    )
+    with op.batch_alter_table('book_daily_circulation', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_book_daily_circulation_day'), ['day'], unique=False)
+
+    op.create_table('school_daily_circulation',
+    sa.Column('school', sa.String(length=100), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('borrows', sa.Integer(), nullable=False),
+    sa.Column('returns', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('school', 'day')
+    )
+    with op.batch_alter_table('school_daily_circulation', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_school_daily_circulation_day'), ['day'], unique=False)
+
+    op.create_table('book_circulation_total',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('borrows', sa.Integer(), nullable=False),
+    sa.Column('returns', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['book.id'], ),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    with op.batch_alter_table('book_circulation_total', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_book_circulation_total_borrows'), ['borrows'], unique=False)
+
+    op.create_table('school_circulation_total',
+    sa.Column('school', sa.String(length=100), nullable=False),
+    sa.Column('borrows', sa.Integer(), nullable=False),
+    sa.Column('returns', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('school')
+    )
+
+    # Backfill from the existing history; `flask rollups rebuild` does the same later
+    op.execute(
+        "INSERT INTO book_daily_circulation (book_id, day, borrows, returns) "
+        f"SELECT book_id, day, SUM(borrows), SUM(returns) FROM ({EVENTS}) AS events "
+        "GROUP BY book_id, day"
+    )
+    op.execute(
+        "INSERT INTO school_daily_circulation (school, day, borrows, returns) "
+        f"SELECT student.school, events.day, SUM(events.borrows), SUM(events.returns) FROM ({EVENTS}) AS events "
+        "JOIN student ON student.id = events.student_id "
+        "GROUP BY student.school, events.day"
+    )
+    op.execute(
+        "INSERT INTO book_circulation_total (book_id, borrows, returns) "
+        "SELECT book_id, SUM(borrows), SUM(returns) FROM book_daily_circulation GROUP BY book_id"
+    )
+    op.execute(
+        "INSERT INTO school_circulation_total (school, borrows, returns) "
+        "SELECT school, SUM(borrows), SUM(returns) FROM school_daily_circulation GROUP BY school"
+    )
+
+
+def downgrade():
+    op.drop_table('school_circulation_total')
+    with op.batch_alter_table('book_circulation_total', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_book_circulation_total_borrows'))
+
+    op.drop_table('book_circulation_total')
+    with op.batch_alter_table('school_daily_circulation', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_school_daily_circulation_day'))
+
+    op.drop_table('school_daily_circulation')
+    with op.batch_alter_table('book_daily_circulation', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_book_daily_circulation_day'))
+
+    op.drop_table('book_daily_circulation')
@@ -0,0 +1,31 @@
+"""Index student names and borrowing due dates for the admin table sorts
+
+Revision ID: e31d9a4c6b58
+Revises: c7a4e19b2f63
+Create Date: 2026-10-16 16:05:27.301644
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e31d9a4c6b58'
+down_revision = 'c7a4e19b2f63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_student_full_name'), ['full_name'], unique=False)
+
+    with op.batch_alter_table('borrowing', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_borrowing_due_date'), ['due_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('borrowing', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_borrowing_due_date'))
+
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_student_full_name'))
@@ -1,4 +1,4 @@
-from app import create_app, db
+from app import create_app, db, rollups
 from app.models import Book, Student, Borrowing
 
 def populate_db():
@@ -9,6 +9,7 @@ def populate_db():
         for student in old_students:
             db.session.delete(student)
         db.session.commit()
+        rollups.rebuild()
         
         books = [
             Book(isbn='9780061120084', title='To Kill a Mockingbird', author='Harper Lee', genre='Fiction', quantity=4),
@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import event, text
+from app import create_app, db
+from app.models import Book, Student
+
+class ApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            for i in range(5):
+                db.session.add(Book(isbn=f'978000000000{i}', title=f'Book {i}', author='Author',
+                                    genre='Fiction', quantity=2, available_quantity=2))
+            db.session.add(Student(email='jane@example.com', full_name='Jane Doe',
+                                   class_name='10A', school='School A'))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_books_keyset_pagination(self):
+        response = self.client.get('/api/books?limit=2')
+        data = response.get_json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['next_cursor'], str(data['books'][-1]['id']))
+
+        seen = [b['id'] for b in data['books']]
+        while data['next_cursor']:
+            data = self.client.get(f"/api/books?limit=2&after={data['next_cursor']}").get_json()
+            seen.extend(b['id'] for b in data['books'])
+
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 5)
+
+    def test_last_page_has_no_cursor(self):
+        data = self.client.get('/api/students?limit=10').get_json()
+        self.assertEqual(data['count'], 1)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_full_text_search_ranks_matches(self):
+        with self.app.app_context():
+            db.session.add(Book(isbn='9780547928227', title='The Hobbit', author='J.R.R. Tolkien',
+                                genre='Fantasy', quantity=1, available_quantity=1))
+            db.session.add(Book(isbn='9780261102385', title='The Lord of the Rings',
+                                author='J.R.R. Tolkien', genre='Fantasy', quantity=1, available_quantity=0))
+            db.session.commit()
+
+        data = self.client.get('/api/books/search?q=tolk').get_json()
+        self.assertEqual(data['count'], 2)
+
+        data = self.client.get('/api/books/search?q=hobbit tolkien').get_json()
+        self.assertEqual([b['title'] for b in data['books']], ['The Hobbit'])
+
+        data = self.client.get('/api/books/search?q=tolkien&available_only=true').get_json()
+        self.assertEqual([b['title'] for b in data['books']], ['The Hobbit'])
+
+    def test_full_text_index_follows_updates_and_deletes(self):
+        with self.app.app_context():
+            book = Book.query.filter_by(title='Book 1').first()
+            book.title = 'Noli Me Tangere'
+            db.session.delete(Book.query.filter_by(title='Book 2').first())
+            db.session.commit()
+
+        titles = [b['title'] for b in self.client.get('/api/books/search?q=book').get_json()['books']]
+        self.assertEqual(sorted(titles), ['Book 0', 'Book 3', 'Book 4'])
+        data = self.client.get('/api/books/search?q=tangere').get_json()
+        self.assertEqual(data['count'], 1)
+
+    def test_search_requires_query(self):
+        response = self.client.get('/api/books/search?q=')
+        self.assertEqual(response.status_code, 400)
+
+    def test_statistics_are_cached_and_invalidated(self):
+        stats = self.client.get('/api/statistics').get_json()['statistics']
+        self.assertEqual(stats['total_books'], 5)
+        self.assertEqual(stats['total_copies'], 10)
+        self.assertEqual(stats['total_students'], 1)
+
+        with self.app.app_context():
+            # Raw SQL bypasses the ORM hooks, so the cached value is still served
+            db.session.execute(text('UPDATE book SET quantity = 9'))
+            db.session.commit()
+        stats = self.client.get('/api/statistics').get_json()['statistics']
+        self.assertEqual(stats['total_copies'], 10)
+
+        self.client.post('/api/books', json={'isbn': '9780000000099', 'title': 'New',
+                                             'author': 'Author', 'quantity': 3})
+        stats = self.client.get('/api/statistics').get_json()['statistics']
+        self.assertEqual(stats['total_books'], 6)
+        self.assertEqual(stats['total_copies'], 48)
+
+    def test_batch_borrow_and_return(self):
+        with self.app.app_context():
+            student_id = Student.query.first().id
+            book_ids = [b.id for b in Book.query.order_by(Book.id).limit(2)]
+
+        items = [{'student_id': student_id, 'book_id': book_ids[0]}] * 3 + [
+            {'student_id': student_id, 'book_id': book_ids[1]},
+            {'student_id': 999, 'book_id': book_ids[1]},
+        ]
+        data = self.client.post('/api/borrowings/batch', json={'items': items}).get_json()
+        self.assertEqual(data['succeeded'], 3)
+        self.assertEqual([r['success'] for r in data['results']], [True, True, False, True, False])
+        self.assertEqual(data['results'][2]['error'], 'No copies available for this book')
+        self.assertEqual(data['results'][4]['error'], 'Student not found')
+        self.assertEqual(data['results'][0]['borrowing']['student_name'], 'Jane Doe')
+
+        borrowing_ids = [r['borrowing']['id'] for r in data['results'] if r['success']]
+        data = self.client.post('/api/borrowings/returns/batch',
+                                json={'borrowing_ids': borrowing_ids + [borrowing_ids[0], 999]}).get_json()
+        self.assertEqual(data['succeeded'], 3)
+        self.assertEqual(data['results'][0]['borrowing']['status'], 'returned')
+        self.assertEqual(data['results'][3]['error'], 'Book has already been returned')
+        self.assertEqual(data['results'][4]['error'], 'Borrowing record not found')
+
+        with self.app.app_context():
+            self.assertEqual([db.session.get(Book, i).available_quantity for i in book_ids], [2, 2])
+
+    def test_batch_rejects_malformed_items(self):
+        response = self.client.post('/api/borrowings/batch', json={'items': [{'student_id': 1}]})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/borrowings/batch', json={'items': [
+            {'student_id': 1, 'book_id': 1}, {'student_id': 'abc', 'book_id': {}}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Item 1', response.get_json()['error'])
+
+        response = self.client.post('/api/borrowings/batch', data='not json',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_return_rejects_malformed_ids(self):
+        response = self.client.post('/api/borrowings/returns/batch', json={'borrowing_ids': ['1', 'abc']})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Item 1', response.get_json()['error'])
+
+        for body in ({'borrowing_ids': [{}]}, {'borrowing_ids': [None, True]}, ['not', 'a', 'dict']):
+            response = self.client.post('/api/borrowings/returns/batch', json=body)
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/borrowings/returns/batch', data='{',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get_returns_304_after_only_the_version_lookup(self):
+        first = self.client.get('/api/books?limit=2')
+        etag = first.headers['ETag']
+        self.assertIsNotNone(first.headers.get('Last-Modified'))
+
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get('/api/books?limit=2', headers={'If-None-Match': etag})
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('FROM data_version', statements[0])
+
+        other_page = self.client.get('/api/books?limit=3', headers={'If-None-Match': etag})
+        self.assertEqual(other_page.status_code, 200)
+
+    def test_mutations_change_the_etag(self):
+        etag = self.client.get('/api/books').headers['ETag']
+        stats_etag = self.client.get('/api/statistics').headers['ETag']
+
+        with self.app.app_context():
+            student_id = Student.query.first().id
+            book_id = Book.query.first().id
+        self.client.post('/api/borrowings', json={'student_id': student_id, 'book_id': book_id})
+
+        response = self.client.get('/api/books', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        response = self.client.get('/api/statistics', headers={'If-None-Match': stats_etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_database_without_data_version_serves_without_etags(self):
+        with self.app.app_context():
+            db.session.execute(text('DROP TABLE data_version'))
+            db.session.commit()
+            book_id = Book.query.first().id
+
+        for path in ('/api/books', f'/api/books/{book_id}', '/api/books/search?q=book', '/api/statistics'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertNotIn('ETag', response.headers)
+
+    def test_writes_from_another_connection_change_the_etag(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+        try:
+            with app.app_context():
+                db.create_all()
+                db.session.add(Book(isbn='9780000000000', title='Book 0', author='Author', quantity=1,
+                                    available_quantity=1))
+                db.session.commit()
+            client = app.test_client()
+            etag = client.get('/api/books').headers['ETag']
+            self.assertEqual(client.get('/api/books', headers={'If-None-Match': etag}).status_code, 304)
+
+            # Another process (an import, populate_db.py, another worker) writes directly
+            with sqlite3.connect(path) as conn:
+                conn.execute("INSERT INTO book (isbn, title, author, quantity, available_quantity) "
+                             "VALUES ('9780000000001', 'Book 1', 'Author', 1, 1)")
+
+            response = client.get('/api/books', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['count'], 2)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/books').headers['Last-Modified']
+        response = self.client.get('/api/books', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_sparse_fieldsets(self):
+        data = self.client.get('/api/books?limit=2&fields=title,available_quantity').get_json()
+        self.assertEqual(set(data['books'][0]), {'id', 'title', 'available_quantity'})
+        self.assertEqual(data['next_cursor'], str(data['books'][-1]['id']))
+
+        book_id = data['books'][0]['id']
+        book = self.client.get(f'/api/books/{book_id}?fields=isbn').get_json()['book']
+        self.assertEqual(book, {'id': book_id, 'isbn': '9780000000000'})
+
+        response = self.client.get('/api/students?fields=full_name,password_hash')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password_hash', response.get_json()['error'])
+
+    def test_borrowing_list_is_one_query(self):
+        with self.app.app_context():
+            student_id = Student.query.first().id
+            book_ids = [book.id for book in Book.query.all()]
+        self.client.post('/api/borrowings/batch', json={
+            'items': [{'student_id': student_id, 'book_id': book_id} for book_id in book_ids]
+        })
+
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            data = self.client.get('/api/borrowings').get_json()
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len([s for s in statements if 'FROM borrowing' in s]), 1)
+        self.assertEqual(data['borrowings'][0]['student_name'], 'Jane Doe')
+        self.assertEqual(data['borrowings'][0]['book_title'], 'Book 0')
+        self.assertIsNone(data['borrowings'][0]['return_date'])
+
+        sparse = self.client.get('/api/borrowings?fields=status').get_json()
+        self.assertEqual(sparse['borrowings'][0], {'id': data['borrowings'][0]['id'], 'status': 'borrowed'})
+
+    def test_ndjson_streams_every_record(self):
+        response = self.client.get('/api/books?format=ndjson&fields=title')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(set(records[0]), {'id', 'title'})
+        self.assertEqual([r['id'] for r in records], sorted(r['id'] for r in records))
+
+        after = records[1]['id']
+        response = self.client.get(f'/api/books?after={after}', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+
+        students = self.client.get('/api/students', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(json.loads(students.get_data(as_text=True))['full_name'], 'Jane Doe')
+        self.assertEqual(self.client.get('/api/borrowings?format=ndjson').get_data(), b'')
+
+    def test_ndjson_and_json_have_different_etags(self):
+        json_etag = self.client.get('/api/books').headers['ETag']
+        response = self.client.get('/api/books', headers={'Accept': 'application/x-ndjson',
+                                                          'If-None-Match': json_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept', response.headers['Vary'])
+
+if __name__ == '__main__':
+    unittest.main()
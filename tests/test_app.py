@@ -1,13 +1,17 @@
+import os
+import tempfile
 import unittest
 from app import create_app, db
 from app.models import Book, Student, Borrowing
 from datetime import datetime, timedelta
+from sqlalchemy import text
 
 class LibraryTestCase(unittest.TestCase):
     def setUp(self):
-        self.app = create_app()
-        self.app.config['TESTING'] = True
-        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
         self.client = self.app.test_client()
         with self.app.app_context():
             db.create_all()
@@ -66,5 +70,36 @@ class LibraryTestCase(unittest.TestCase):
             self.assertEqual(book.available_quantity, 1)
             self.assertEqual(borrowing.status, 'returned')
 
+    def test_hot_queries_use_indexes(self):
+        queries = [
+            "SELECT count(*) FROM borrowing WHERE status = 'borrowed' AND due_date < '2030-01-01'",
+            "SELECT * FROM borrowing WHERE student_id = 1 AND status = 'borrowed'",
+            "SELECT count(*) FROM borrowing WHERE book_id = 1 AND status = 'borrowed'",
+            "SELECT * FROM book WHERE available_quantity > 0 AND genre = 'Fiction' ORDER BY title",
+            "SELECT * FROM student WHERE school = 'School A'",
+        ]
+        with self.app.app_context():
+            for query in queries:
+                plan = db.session.execute(text('EXPLAIN QUERY PLAN ' + query)).fetchall()
+                detail = ' '.join(row[-1] for row in plan)
+                self.assertIn('USING', detail, query)
+                self.assertNotRegex(detail, r'SCAN (book|borrowing|student)$', query)
+
+    def test_sqlite_pragmas_applied_to_connections(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+        try:
+            with app.app_context():
+                self.assertEqual(db.session.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+                self.assertEqual(db.session.execute(text('PRAGMA busy_timeout')).scalar(), 5000)
+                self.assertEqual(db.session.execute(text('PRAGMA synchronous')).scalar(), 1)
+                db.session.remove()
+                db.engine.dispose()
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from app import create_app, db
+from app.assets import VENDOR_ASSETS
+
+
+class AssetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def stylesheets(self, url):
+        page = self.client.get(url).get_data(as_text=True)
+        self.assertNotIn('<style>', page)
+        return re.findall(r'<link href="([^"]+)" rel="stylesheet">', page)
+
+    def test_pages_link_fingerprinted_stylesheets(self):
+        links = self.stylesheets('/')
+        self.assertIn('/assets/css/pages/index.', links[-1])
+        base = [link for link in links if link.startswith('/assets/css/base.')][0]
+
+        response = self.client.get(base)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('.navbar-custom', response.get_data(as_text=True))
+
+        # Login and signup share the base stylesheet, so it is fetched once
+        self.assertIn(base, self.stylesheets('/signup'))
+
+    def test_stale_and_missing_assets(self):
+        stale = self.client.get('/assets/css/base.000000000000.css')
+        self.assertEqual(stale.status_code, 200)
+        self.assertNotIn('immutable', stale.headers['Cache-Control'])
+        self.assertEqual(self.client.get('/assets/css/missing.css').status_code, 404)
+        self.assertEqual(self.client.get('/assets/../__init__.py').status_code, 404)
+
+    def test_vendored_files_replace_cdn_links(self):
+        bootstrap = 'vendor/bootstrap/css/bootstrap.min.css'
+        self.assertIn(VENDOR_ASSETS[bootstrap], self.stylesheets('/'))
+
+        static = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static)
+        shutil.copytree(self.app.static_folder, static, dirs_exist_ok=True)
+        os.makedirs(os.path.join(static, 'vendor/bootstrap/css'))
+        with open(os.path.join(static, bootstrap), 'w') as f:
+            f.write('.container{}')
+        self.app.static_folder = static
+        self.app.extensions.pop('asset_fingerprints', None)
+
+        links = self.stylesheets('/')
+        self.assertNotIn(VENDOR_ASSETS[bootstrap], links)
+        local = [link for link in links if link.startswith('/assets/vendor/bootstrap/')][0]
+        self.assertEqual(self.client.get(local).get_data(as_text=True), '.container{}')
+
+if __name__ == '__main__':
+    unittest.main()
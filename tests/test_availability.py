@@ -0,0 +1,107 @@
+import json
+import unittest
+from app import create_app, db, circulation
+from app.availability import get_broker
+from app.models import Book, Student
+
+class AvailabilityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'AVAILABILITY_HEARTBEAT': 0.05
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            student = Student(email='jane@example.com', full_name='Jane Doe',
+                              class_name='10A', school='School A')
+            student.set_password('jane123')
+            books = [Book(isbn=f'978000000000{i}', title=f'Book {i}', author='Author',
+                          quantity=2, available_quantity=2) for i in range(2)]
+            db.session.add_all([student] + books)
+            db.session.commit()
+            self.student_id = student.id
+            self.book_ids = [b.id for b in books]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def drain(self, subscription):
+        messages = []
+        while (message := subscription.get(timeout=0)) is not None:
+            messages.append(message)
+        return messages
+
+    def test_stock_changes_are_published_after_commit(self):
+        book_id = self.book_ids[0]
+        with self.app.app_context():
+            subscription = get_broker().subscribe()
+
+            borrowing = circulation.borrow_book(self.student_id, book_id)
+            self.assertEqual(self.drain(subscription), [{'book_id': book_id, 'available_quantity': 1}])
+
+            circulation.return_book(borrowing)
+            self.assertEqual(self.drain(subscription), [{'book_id': book_id, 'available_quantity': 2}])
+
+            # Edits through the ORM are seen too, other columns are not
+            book = db.session.get(Book, book_id)
+            book.title = 'Renamed'
+            db.session.commit()
+            self.assertEqual(self.drain(subscription), [])
+            book.available_quantity = 0
+            db.session.commit()
+            self.assertEqual(self.drain(subscription), [{'book_id': book_id, 'available_quantity': 0}])
+
+            # Nothing is published for a rolled back transaction
+            circulation.take_copy(self.book_ids[1])
+            db.session.rollback()
+            self.assertEqual(self.drain(subscription), [])
+            subscription.close()
+
+    def test_stream_sends_server_sent_events(self):
+        book_id = self.book_ids[1]
+        response = self.client.get(f'/api/stream/availability?book_id={book_id}', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertNotIn('Content-Encoding', response.headers)
+        events = iter(response.response)
+        self.assertEqual(next(events), b'retry: 3000\n\n')
+
+        with self.app.app_context():
+            circulation.borrow_book(self.student_id, self.book_ids[0])
+            circulation.borrow_book(self.student_id, book_id)
+        self.assertEqual(next(events), b'data: ' + json.dumps(
+            {'book_id': book_id, 'available_quantity': 1}).encode() + b'\n\n')
+        self.assertEqual(next(events), b': keep-alive\n\n')
+
+        response.close()
+        with self.app.app_context():
+            self.assertFalse(get_broker()._subscriptions)
+
+    def test_streams_are_capped_per_process(self):
+        self.app.config['AVAILABILITY_MAX_STREAMS'] = 1
+        first = self.client.get('/api/stream/availability', buffered=False)
+        self.assertEqual(first.status_code, 200)
+
+        refused = self.client.get('/api/stream/availability', buffered=False)
+        self.assertEqual(refused.status_code, 503)
+        self.assertEqual(refused.headers['Retry-After'], '3')
+
+        # Closing a stream (twice, as the body and the response both do) frees exactly one slot
+        first.close()
+        first.close()
+        second = self.client.get('/api/stream/availability', buffered=False)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(self.client.get('/api/stream/availability', buffered=False).status_code, 503)
+        second.close()
+
+    def test_pages_only_stream_when_live(self):
+        self.client.post('/login', data={'email': 'jane@example.com', 'password': 'jane123'})
+        for path in ('/available_books', '/dashboard'):
+            self.assertNotIn('/api/stream/availability', self.client.get(path).get_data(as_text=True), path)
+            self.assertIn('/api/stream/availability', self.client.get(path + '?live=1').get_data(as_text=True), path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from app import create_app, db
+from app.models import Book
+
+class CatalogImportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        self.runner = self.app.test_cli_runner()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Book(isbn='9780000000001', title='Existing', author='Author',
+                                quantity=1, available_quantity=1))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_csv(self):
+        path = self.write_file('.csv', (
+            'isbn,title,author,genre,quantity\n'
+            '978-0-00-000000-1,Existing,Author,,1\n'
+            '9780000000002,New Book,Someone,Fiction,3\n'
+            '9780000000002,New Book Again,Someone,Fiction,3\n'
+            '123,Bad Isbn,Someone,,1\n'
+            '9780000000003,Another,Someone Else,,\n'
+        ))
+        result = self.runner.invoke(args=['catalog', 'import', path, '--chunk-size', '1'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 2 books, skipped 2 duplicate and 1 invalid rows', result.output)
+        with self.app.app_context():
+            book = Book.query.filter_by(isbn='9780000000002').one()
+            self.assertEqual((book.quantity, book.available_quantity), (3, 3))
+            self.assertEqual(Book.query.filter_by(isbn='9780000000003').one().quantity, 1)
+
+    def test_import_csv_with_bom_rejects_zero_quantity(self):
+        path = self.write_file('.csv', (
+            '\ufeffisbn,title,author,quantity\n'
+            '9780000000006,Spreadsheet Book,Someone, \n'
+            '9780000000007,No Copies,Someone,0\n'
+        ))
+        result = self.runner.invoke(args=['catalog', 'import', path, '--max-errors', '0'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 1 books, skipped 0 duplicate and 1 invalid rows', result.output)
+        self.assertNotIn('line 3', result.output)
+        with self.app.app_context():
+            self.assertEqual(Book.query.filter_by(isbn='9780000000006').one().quantity, 1)
+            self.assertIsNone(Book.query.filter_by(isbn='9780000000007').first())
+
+    def test_import_jsonl(self):
+        path = self.write_file('.jsonl', (
+            '{"isbn": "9780000000004", "title": "Json Book", "author": "Writer", "quantity": 2}\n'
+            '{"isbn": "9780000000005", "title": ""}\n'
+            'not json\n'
+        ))
+        result = self.runner.invoke(args=['catalog', 'import', path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 1 books, skipped 0 duplicate and 2 invalid rows', result.output)
+        with self.app.app_context():
+            self.assertEqual(Book.query.count(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
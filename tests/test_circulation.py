@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+import unittest
+from app import create_app, db, circulation
+from app.models import Book, Student, Borrowing
+
+class CirculationTestCase(unittest.TestCase):
+    def setUp(self):
+        # Threads need their own connections, so use a file rather than :memory:
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}'
+        })
+        with self.app.app_context():
+            db.create_all()
+            students = [Student(email=f'student{i}@example.com', full_name=f'Student {i}',
+                                class_name='10A', school='School A') for i in range(20)]
+            book = Book(isbn='9780000000001', title='Last Copies', author='Author',
+                        quantity=3, available_quantity=3)
+            db.session.add_all(students + [book])
+            db.session.commit()
+            self.student_ids = [s.id for s in students]
+            self.book_id = book.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        os.remove(self.db_path)
+
+    def run_concurrently(self, target, args_list):
+        barrier = threading.Barrier(len(args_list))
+        results = []
+        lock = threading.Lock()
+
+        def worker(*args):
+            with self.app.app_context():
+                barrier.wait()
+                try:
+                    outcome = target(*args)
+                except circulation.CirculationError as e:
+                    outcome = e
+                finally:
+                    db.session.remove()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=worker, args=args) for args in args_list]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_borrows_never_oversell(self):
+        def borrow(student_id):
+            return circulation.borrow_book(student_id, self.book_id).id
+
+        results = self.run_concurrently(borrow, [(sid,) for sid in self.student_ids])
+
+        successes = [r for r in results if isinstance(r, int)]
+        failures = [r for r in results if isinstance(r, circulation.BookUnavailable)]
+        self.assertEqual(len(successes), 3)
+        self.assertEqual(len(failures), 17)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Book, self.book_id).available_quantity, 0)
+            self.assertEqual(Borrowing.query.count(), 3)
+
+    def test_concurrent_returns_release_copy_once(self):
+        with self.app.app_context():
+            borrowing_id = circulation.borrow_book(self.student_ids[0], self.book_id).id
+
+        def give_back():
+            borrowing = db.session.get(Borrowing, borrowing_id)
+            return circulation.return_book(borrowing).status
+
+        results = self.run_concurrently(give_back, [()] * 10)
+
+        self.assertEqual(results.count('returned'), 1)
+        self.assertEqual(sum(isinstance(r, circulation.AlreadyReturned) for r in results), 9)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Book, self.book_id).available_quantity, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import gzip
+import json
+import unittest
+from flask import Response, request, stream_with_context
+from app import create_app, db
+from app.models import Book
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            for i in range(40):
+                db.session.add(Book(isbn=f'97800000000{i:02d}', title=f'Book {i}', author='Author',
+                                    genre='Fiction', quantity=2, available_quantity=2))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_json_is_gzipped_when_accepted(self):
+        plain = self.client.get('/api/books')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self.client.get('/api/books', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        body = response.get_data()
+        self.assertLess(len(body), len(plain.get_data()))
+        self.assertEqual(json.loads(gzip.decompress(body)), plain.get_json())
+
+        # The compressed variant gets a weak ETag that still revalidates
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        revalidated = self.client.get('/api/books', headers={'Accept-Encoding': 'gzip',
+                                                             'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get('/api/books?limit=1&fields=title', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streamed_responses_are_compressed(self):
+        plain = self.client.get('/api/books?format=ndjson').get_data()
+        response = self.client.get('/api/books?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gzip.decompress(response.get_data()), plain)
+
+    def test_closing_a_compressed_stream_closes_the_body(self):
+        torn_down, bodies = [], []
+
+        @self.app.route('/rows')
+        def rows():
+            # Keep the body alive so only an explicit close() can end its request context
+            bodies.append(stream_with_context(f'row {i}\n' for i in range(1000)))
+            return Response(bodies[-1], mimetype='text/csv')
+
+        @self.app.teardown_request
+        def record_teardown(exc):
+            torn_down.append(request.path)
+
+        response = self.client.get('/rows', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        next(iter(response.response))
+        self.assertEqual(torn_down, [])
+        response.close()
+        self.assertEqual(torn_down, ['/rows'])
+
+if __name__ == '__main__':
+    unittest.main()
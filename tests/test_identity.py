@@ -0,0 +1,97 @@
+import unittest
+from contextlib import contextmanager
+from sqlalchemy import event, update
+from app import create_app, db, circulation
+from app.models import Book, Student
+
+
+class UserCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            admin = Student(email='admin@example.com', full_name='Admin', class_name='Staff',
+                            school='School A', is_admin=True)
+            admin.set_password('admin123')
+            student = Student(email='jane@example.com', full_name='Jane Doe',
+                              class_name='10A', school='School B')
+            student.set_password('jane123')
+            book = Book(isbn='9780000000001', title='Test Book', author='Test Author',
+                        quantity=3, available_quantity=3)
+            db.session.add_all([admin, student, book])
+            db.session.commit()
+            self.admin_id = admin.id
+            self.student_id = student.id
+            self.book_id = book.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    @contextmanager
+    def user_lookups(self):
+        lookups = []
+        with self.app.app_context():
+            engine = db.engine
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if 'FROM student' in statement and 'WHERE student.id = ?' in statement:
+                lookups.append(statement)
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield lookups
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    def test_authenticated_requests_skip_user_lookup(self):
+        with self.app.app_context():
+            circulation.borrow_book(self.student_id, self.book_id)
+        self.client.post('/login', data={'email': 'jane@example.com', 'password': 'jane123'})
+        self.client.get('/dashboard')
+
+        with self.user_lookups() as lookups:
+            page = self.client.get('/dashboard').get_data(as_text=True)
+        self.assertEqual(lookups, [])
+        # Relationships on the cached identity still load
+        self.assertIn('Test Book', page)
+
+    def test_admin_flag_change_invalidates_cache(self):
+        self.client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+        self.assertEqual(self.client.get('/books').status_code, 200)
+
+        with self.app.app_context():
+            db.session.get(Student, self.admin_id).is_admin = False
+            db.session.commit()
+        self.assertEqual(self.client.get('/books').status_code, 302)
+
+    def test_demotion_by_another_process_is_seen(self):
+        self.client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+        self.assertEqual(self.client.get('/books').status_code, 200)
+
+        # A plain connection bypasses the session commit hooks, like another worker would
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(update(Student).where(Student.id == self.admin_id).values(is_admin=False))
+        self.assertEqual(self.client.get('/books').status_code, 302)
+
+    def test_deleted_student_is_logged_out(self):
+        self.client.post('/login', data={'email': 'jane@example.com', 'password': 'jane123'})
+        self.client.get('/dashboard')
+        with self.app.app_context():
+            db.session.delete(db.session.get(Student, self.student_id))
+            db.session.commit()
+        self.assertEqual(self.client.get('/dashboard').status_code, 302)
+
+    def test_cache_can_be_disabled(self):
+        self.app.config['USER_CACHE_TTL'] = 0
+        self.client.post('/login', data={'email': 'jane@example.com', 'password': 'jane123'})
+        with self.user_lookups() as lookups:
+            self.client.get('/dashboard')
+        self.assertEqual(len(lookups), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from app import create_app, db
+from app.models import Book, Student
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'SLOW_REQUEST_MS': None
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            admin = Student(email='admin@example.com', full_name='Admin', class_name='Staff',
+                            school='School A', is_admin=True)
+            admin.set_password('admin123')
+            db.session.add_all([admin, Book(isbn='9780000000001', title='Test Book', author='Test Author',
+                                            genre='Fiction', quantity=3, available_quantity=3)])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def metrics(self):
+        response = self.client.get('/metrics')
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        return response.get_data(as_text=True)
+
+    def test_records_latency_and_queries_per_endpoint(self):
+        self.client.get('/api/books')
+        self.client.get('/api/books')
+        text = self.metrics()
+
+        self.assertIn('edulib_http_request_duration_seconds_count{endpoint="api.get_books",method="GET"} 2', text)
+        self.assertIn('edulib_http_requests_total{endpoint="api.get_books",method="GET",status="200"} 2', text)
+        self.assertIn('edulib_http_request_duration_seconds_bucket{endpoint="api.get_books",method="GET",le="+Inf"} 2', text)
+        # One data_version lookup for the ETag plus the page query, per request
+        self.assertIn('edulib_db_queries_total{endpoint="api.get_books",method="GET"} 4', text)
+
+    def test_streamed_exports_are_recorded_after_the_body(self):
+        self.client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+        response = self.client.get('/export/borrowings/csv')
+        self.assertNotIn('export_borrowings', self.metrics())
+
+        response.get_data()
+        text = self.metrics()
+        self.assertIn('endpoint="main.export_borrowings_csv",method="GET",status="200"} 1', text)
+        # The export's two queries plus the data_version lookup behind the cached identity
+        self.assertIn('edulib_db_queries_total{endpoint="main.export_borrowings_csv",method="GET"} 3', text)
+
+    def test_slow_requests_are_logged_with_statements(self):
+        self.app.config['SLOW_REQUEST_MS'] = 0
+        with self.assertLogs(self.app.logger, level='WARNING') as logs:
+            self.client.get('/api/books')
+        self.assertIn('Slow request GET /api/books', logs.output[0])
+        self.assertIn('FROM book', logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app import create_app, db
+from app.cache import SQLiteCache
+from app.models import Book, Student
+from app.openlibrary import OpenLibraryClient, OpenLibraryError
+
+STUB_RESPONSES = {
+    '/search.json': {'docs': [{'title': 'The Hobbit', 'author_name': ['J.R.R. Tolkien'],
+                               'key': '/works/OL1W', 'isbn': ['9780547928227']}]},
+    '/works/OL1W.json': {'title': 'Good Omens', 'isbn_13': ['9780060853983'],
+                         'subjects': ['Fantasy'],
+                         'authors': [{'key': '/authors/OL1A'}, {'key': '/authors/OL2A'}]},
+    '/authors/OL1A.json': {'name': 'Terry Pratchett'},
+    '/authors/OL2A.json': {'name': 'Neil Gaiman'},
+    '/works/OL2W.json': {'title': 'Anthology', 'subjects': ['Short Stories'],
+                         'authors': [{'key': f'/authors/OL{i}S'} for i in range(4)]},
+    '/works/OL2W/editions.json': {'entries': [{'title': 'Anthology'}, {'isbn_10': ['0000000002']}]},
+    '/works/OL3W.json': {'title': 'Slow Author Book', 'isbn_13': ['9780000000003'],
+                         'authors': [{'key': '/authors/OL1A'}, {'key': '/authors/SLOW'}]},
+    '/authors/SLOW.json': {'name': 'Never Arrives'},
+}
+STUB_RESPONSES.update({f'/authors/OL{i}S.json': {'name': f'Writer {i}'} for i in range(4)})
+
+STUB_DELAYS = {f'/authors/OL{i}S.json': 0.3 for i in range(4)}
+STUB_DELAYS['/authors/SLOW.json'] = 2
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        self.server.hits.append(path)
+        time.sleep(STUB_DELAYS.get(path, 0))
+        body = STUB_RESPONSES.get(path)
+        self.send_response(200 if body else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body or {}).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServerMixin:
+    def start_stub_server(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.hits = []
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+
+class OpenLibraryClientTestCase(StubServerMixin, unittest.TestCase):
+    def setUp(self):
+        self.base_url = self.start_stub_server()
+
+    def test_responses_are_cached(self):
+        client = OpenLibraryClient(base_url=self.base_url)
+        first = client.search('hobbit')
+        second = client.search('hobbit')
+        client.search('other')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.hits, ['/search.json', '/search.json'])
+
+    def test_persistent_cache_survives_new_client(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        OpenLibraryClient(base_url=self.base_url, persistent_cache=SQLiteCache(path)).get_author('/authors/OL1A')
+        fresh = OpenLibraryClient(base_url=self.base_url, persistent_cache=SQLiteCache(path))
+
+        self.assertEqual(fresh.get_author('/authors/OL1A')['name'], 'Terry Pratchett')
+        self.assertEqual(self.server.hits, ['/authors/OL1A.json'])
+
+    def test_expired_entries_are_refetched(self):
+        client = OpenLibraryClient(base_url=self.base_url, cache_ttl=0)
+        client.get_author('/authors/OL1A')
+        client.get_author('/authors/OL1A')
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test_errors_are_not_cached(self):
+        client = OpenLibraryClient(base_url=self.base_url)
+        for _ in range(2):
+            with self.assertRaises(OpenLibraryError):
+                client.get_work('/works/MISSING')
+        self.assertEqual(len(self.server.hits), 2)
+
+
+class OpenLibraryRoutesTestCase(StubServerMixin, unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'OPENLIBRARY_BASE_URL': self.start_stub_server()
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            admin = Student(email='admin@example.com', full_name='Admin', class_name='Staff',
+                            school='School A', is_admin=True)
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+        self.client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_search_books_uses_client(self):
+        page = self.client.get('/search-books?q=hobbit').get_data(as_text=True)
+        self.assertIn('The Hobbit', page)
+        self.client.get('/search-books?q=hobbit')
+        self.assertEqual(self.server.hits, ['/search.json'])
+
+    def test_import_fetches_authors_and_editions_concurrently(self):
+        started = time.perf_counter()
+        self.client.post('/import-book/works/OL2W')
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 1.0)
+        with self.app.app_context():
+            book = Book.query.filter_by(title='Anthology').one()
+            self.assertEqual(book.isbn, '0000000002')
+            self.assertEqual(book.author, 'Writer 0, Writer 1, Writer 2, Writer 3')
+
+    def test_import_deadline_drops_slow_lookups(self):
+        self.app.config['OPENLIBRARY_IMPORT_DEADLINE'] = 0.5
+        started = time.perf_counter()
+        self.client.post('/import-book/works/OL3W')
+
+        self.assertLess(time.perf_counter() - started, 1.5)
+        with self.app.app_context():
+            self.assertEqual(Book.query.filter_by(isbn='9780000000003').one().author, 'Terry Pratchett')
+
+    def test_bulk_import_endpoint(self):
+        keys = ['/works/OL1W', '/works/OL2W', '/works/OL1W', '/works/MISSING']
+        data = self.client.post('/api/books/import', json={'keys': keys}).get_json()
+
+        self.assertEqual(data['imported'], 2)
+        self.assertEqual(data['results'][0]['book']['title'], 'Good Omens')
+        self.assertEqual(data['results'][2]['error'], 'This book already exists in the library.')
+        self.assertIn('404', data['results'][3]['error'])
+        self.assertEqual(self.server.hits.count('/works/OL1W.json'), 1)
+
+    def test_import_book_resolves_authors(self):
+        self.client.post('/import-book/works/OL1W')
+        with self.app.app_context():
+            book = Book.query.filter_by(isbn='9780060853983').one()
+            self.assertEqual(book.title, 'Good Omens')
+            self.assertEqual(book.author, 'Terry Pratchett, Neil Gaiman')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from app import create_app, db
+from app.models import Book, Student
+
+
+class ProfilingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'PROFILE_DIR': self.profile_dir,
+            'PROFILE_KEEP': 2
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            admin = Student(email='admin@example.com', full_name='Admin', class_name='Staff',
+                            school='School A', is_admin=True)
+            admin.set_password('admin123')
+            student = Student(email='jane@example.com', full_name='Jane Doe',
+                              class_name='10A', school='School B')
+            student.set_password('jane123')
+            db.session.add_all([admin, student, Book(isbn='9780000000001', title='Test Book',
+                                                     author='Test Author', quantity=3, available_quantity=3)])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def login(self, email, password):
+        self.client.post('/login', data={'email': email, 'password': password})
+
+    def captured(self):
+        return sorted(name for name in os.listdir(self.profile_dir) if name.endswith('.json'))
+
+    def test_admin_request_is_profiled_on_demand(self):
+        self.login('admin@example.com', 'admin123')
+        self.client.get('/reports')
+        self.assertEqual(self.captured(), [])
+
+        self.assertEqual(self.client.get('/reports?_profile=1').status_code, 200)
+        self.assertEqual(len(self.captured()), 1)
+
+        page = self.client.get('/admin/profiles').get_data(as_text=True)
+        self.assertIn('GET /reports?_profile=1', page)
+
+        with self.app.app_context():
+            from app.profiling import get_profile_store
+            profile = get_profile_store().list()[0]
+            detail = get_profile_store().get(profile['id'])
+        self.assertGreater(detail['queries'], 0)
+        self.assertTrue(any('FROM borrowing' in statement['sql'] for statement in detail['statements']))
+        self.assertTrue(any('reports' in row['function'] for row in detail['top_functions']))
+
+        page = self.client.get(f"/admin/profiles/{profile['id']}").get_data(as_text=True)
+        self.assertIn('Top functions by cumulative time', page)
+        download = self.client.get(f"/admin/profiles/{profile['id']}/download")
+        self.assertEqual(download.status_code, 200)
+        self.assertGreater(len(download.get_data()), 0)
+
+    def test_header_trigger_and_ring_buffer(self):
+        self.login('admin@example.com', 'admin123')
+        for _ in range(3):
+            self.client.get('/api/books', headers={'X-Profile': '1'})
+        self.assertEqual(len(self.captured()), 2)
+        self.assertEqual(len([name for name in os.listdir(self.profile_dir) if name.endswith('.prof')]), 2)
+
+    def test_foreign_files_in_profile_dir_are_ignored(self):
+        with open(os.path.join(self.profile_dir, 'notes.json'), 'w') as f:
+            f.write('{}')
+        self.login('admin@example.com', 'admin123')
+        for _ in range(3):
+            self.client.get('/api/books', headers={'X-Profile': '1'})
+        self.assertEqual(len(self.captured()), 3)
+        self.assertIn('notes.json', self.captured())
+        self.assertEqual(self.client.get('/admin/profiles').status_code, 200)
+
+    def test_profiler_is_disabled_when_the_view_raises(self):
+        self.app.config['PROPAGATE_EXCEPTIONS'] = True
+
+        @self.app.route('/boom')
+        def boom():
+            raise RuntimeError('boom')
+
+        self.login('admin@example.com', 'admin123')
+        with self.assertRaises(RuntimeError):
+            self.client.get('/boom?_profile=1')
+        self.assertIsNone(sys.getprofile())
+
+        # The thread is free to profile the next request
+        self.client.get('/api/books?_profile=1')
+        self.assertEqual(len(self.captured()), 1)
+
+    def test_non_admins_cannot_profile(self):
+        self.login('jane@example.com', 'jane123')
+        self.client.get('/dashboard?_profile=1')
+        self.assertEqual(self.captured(), [])
+        self.assertEqual(self.client.get('/admin/profiles').status_code, 302)
+
+if __name__ == '__main__':
+    unittest.main()
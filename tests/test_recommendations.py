@@ -0,0 +1,66 @@
+import random
+import unittest
+from app import create_app, db, circulation, recommendations
+from app.models import Book, Student
+
+class RecommendationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        with self.app.app_context():
+            db.create_all()
+            students = [Student(email=f'student{i}@example.com', full_name=f'Student {i}',
+                                class_name='10A', school='School A') for i in range(4)]
+            books = [Book(isbn=f'978000000000{i}', title=f'Book {i}', author='Author',
+                          quantity=5, available_quantity=5) for i in range(5)]
+            db.session.add_all(students + books)
+            db.session.commit()
+            self.student_ids = [s.id for s in students]
+            self.book_ids = [b.id for b in books]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def borrow(self, student, *books):
+        for book in books:
+            circulation.borrow_book(self.student_ids[student], self.book_ids[book])
+
+    def test_similar_books_uses_cosine_similarity(self):
+        pairs = [(1, 10), (1, 20), (2, 10), (2, 20), (2, 30), (3, 30)]
+        neighbors = recommendations.similar_books(pairs, k=1)
+        # 10 and 20 share both readers (2 / sqrt(2 * 2) = 1); 30 shares one of two with each
+        self.assertEqual(neighbors, [(10, 20, 1.0), (20, 10, 1.0), (30, 10, 0.5)])
+
+    @unittest.skipUnless(recommendations.np is not None, 'NumPy is not installed')
+    def test_numpy_neighbors_match_pure_python(self):
+        rng = random.Random(7)
+        pairs = sorted({(rng.randrange(60), rng.randrange(40)) for _ in range(400)})
+        expected = list(recommendations._neighbors_python(pairs, 5))
+        # A small block size splits the item-item product across many blocks
+        for block_size in (recommendations.PAIR_BLOCK_SIZE, 50):
+            self.assertEqual(list(recommendations._neighbors_numpy(pairs, 5, block_size)), expected)
+
+    def test_recommendations_follow_co_borrowing(self):
+        with self.app.app_context():
+            self.borrow(0, 0, 1)
+            self.borrow(1, 0, 1, 2)
+            self.borrow(2, 3)
+            self.borrow(3, 3, 4)
+            self.assertGreater(recommendations.rebuild(), 0)
+
+            student = db.session.get(Student, self.student_ids[2])
+            titles = [b.title for b in recommendations.recommend_books(student.borrowings)]
+            self.assertEqual(titles, ['Book 4'])
+
+            # No neighbors for a student without history: most borrowed first, then by id
+            student = Student(email='new@example.com', full_name='New', class_name='10A', school='School A')
+            db.session.add(student)
+            db.session.commit()
+            titles = [b.title for b in recommendations.recommend_books(student.borrowings, limit=3)]
+            self.assertEqual(titles, ['Book 0', 'Book 1', 'Book 3'])
+
+if __name__ == '__main__':
+    unittest.main()
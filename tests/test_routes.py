@@ -0,0 +1,224 @@
+import unittest
+from datetime import date, timedelta
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, db, circulation
+from app.models import Book, Student, Borrowing
+
+class RoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            admin = Student(email='admin@example.com', full_name='Admin', class_name='Staff',
+                            school='School A', is_admin=True)
+            admin.set_password('admin123')
+            student = Student(email='jane@example.com', full_name='Jane Doe',
+                              class_name='10A', school='School B')
+            book = Book(isbn='9780000000001', title='Test Book', author='Test Author',
+                        genre='Fiction', quantity=3, available_quantity=3)
+            db.session.add_all([admin, student, book])
+            db.session.commit()
+            self.student_id = student.id
+            self.book_id = book.id
+        self.client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def add_borrowing(self):
+        with self.app.app_context():
+            return circulation.borrow_book(self.student_id, self.book_id).id
+
+    def return_borrowing(self, borrowing_id):
+        with self.app.app_context():
+            circulation.return_book(db.session.get(Borrowing, borrowing_id))
+
+    @contextmanager
+    def count_queries(self):
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    def test_admin_pages_query_count_is_constant(self):
+        self.add_borrowing()
+        with self.count_queries() as few:
+            self.client.get('/students')
+            self.client.get('/borrowings')
+
+        with self.app.app_context():
+            for i in range(5):
+                student = Student(email=f'student{i}@example.com', full_name=f'Student {i}',
+                                  class_name='10A', school='School B')
+                book = Book(isbn=f'978000000010{i}', title=f'Book {i}', author='Author', quantity=1)
+                db.session.add_all([student, book])
+                db.session.flush()
+                db.session.add(Borrowing(student_id=student.id, book_id=book.id))
+            db.session.commit()
+
+        with self.count_queries() as many:
+            response = self.client.get('/students')
+            self.client.get('/borrowings')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few), len(many))
+
+    def test_admin_dashboard_and_borrow_pages_use_statistics(self):
+        self.add_borrowing()
+        for url in ('/dashboard', '/borrow'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        with self.count_queries() as statements:
+            self.client.get('/borrow')
+        self.assertFalse([s for s in statements if 'count(' in s.lower()])
+
+    def test_export_borrowings_csv(self):
+        self.add_borrowing()
+        response = self.client.get('/export/borrowings/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], 'Student Name,Book Title,ISBN,Borrow Date,Due Date,Return Date,Status,School')
+        self.assertIn('Jane Doe,Test Book,9780000000001', lines[1])
+        self.assertTrue(lines[1].endswith('Not Returned,Borrowed,School B'))
+
+    def test_export_report_csvs(self):
+        self.add_borrowing()
+        self.add_borrowing()
+        popular = self.client.get('/export/popular-books/csv').get_data(as_text=True).splitlines()
+        self.assertEqual(popular, ['Book Title,Borrow Count', 'Test Book,2'])
+        schools = self.client.get('/export/school-books/csv').get_data(as_text=True).splitlines()
+        self.assertEqual(schools, ['School,Total Borrows', 'School B,2'])
+
+    def test_reports_read_rollups(self):
+        from app import rollups
+        from app.models import BookDailyCirculation, SchoolDailyCirculation
+        borrowing_id = self.add_borrowing()
+        self.add_borrowing()
+        self.return_borrowing(borrowing_id)
+        with self.app.app_context():
+            row = BookDailyCirculation.query.one()
+            self.assertEqual((row.borrows, row.returns), (2, 1))
+
+            # Rows written behind the service's back only show up after a rebuild
+            db.session.add(Borrowing(student_id=self.student_id, book_id=self.book_id))
+            db.session.commit()
+            self.assertEqual(rollups.most_borrowed_books().all(), [('Test Book', 2)])
+            rollups.rebuild()
+            self.assertEqual(rollups.most_borrowed_books().all(), [('Test Book', 3)])
+            self.assertEqual(rollups.borrows_per_school().all(), [('School B', 3)])
+
+        with self.count_queries() as statements:
+            page = self.client.get('/reports').get_data(as_text=True)
+        self.assertIn('Test Book', page)
+        self.assertFalse(any('GROUP BY' in sql for sql in statements))
+
+        with self.app.app_context():
+            for model in (BookDailyCirculation, SchoolDailyCirculation):
+                db.session.query(model).update({model.day: date.today() - timedelta(days=40)})
+            db.session.commit()
+        page = self.client.get('/reports?days=30').get_data(as_text=True)
+        self.assertNotIn('Test Book', page)
+        self.assertNotIn('School B', page)
+
+    def test_deleting_student_removes_their_history_from_rollups(self):
+        borrowing_id = self.add_borrowing()
+        self.return_borrowing(borrowing_id)
+        self.client.get(f'/students/delete/{self.student_id}')
+        schools = self.client.get('/export/school-books/csv').get_data(as_text=True).splitlines()
+        self.assertEqual(schools, ['School,Total Borrows'])
+
+    def test_changing_school_moves_rollups_like_a_rebuild(self):
+        from app import rollups
+        from app.models import SchoolDailyCirculation, SchoolCirculationTotal
+
+        def school_rollups():
+            return [sorted((row.school, str(getattr(row, 'day', '')), row.borrows, row.returns)
+                           for row in model.query.all() if row.borrows or row.returns)
+                    for model in (SchoolDailyCirculation, SchoolCirculationTotal)]
+
+        self.return_borrowing(self.add_borrowing())
+        self.add_borrowing()
+        self.client.post(f'/students/edit/{self.student_id}', data={
+            'full_name': 'Jane Doe', 'class_name': '10A', 'school': 'School C', 'contact': ''})
+        self.add_borrowing()
+        self.client.put(f'/api/students/{self.student_id}', json={'school': 'School D'})
+
+        with self.app.app_context():
+            incremental = school_rollups()
+            self.assertEqual(incremental[1], [('School D', '', 3, 1)])
+            rollups.rebuild()
+            self.assertEqual(school_rollups(), incremental)
+
+    def test_available_books_search(self):
+        from app import search
+        with self.app.app_context():
+            db.session.add(Book(isbn='9780451524935', title='1984', author='George Orwell',
+                                genre='Dystopian', quantity=1, available_quantity=1))
+            db.session.commit()
+            engine = db.engine
+
+        for fts in (True, False):
+            search._fts_available[engine] = fts
+            page = self.client.get('/available_books?search=orwell').get_data(as_text=True)
+            self.assertIn('1984', page)
+            self.assertNotIn('Test Book', page)
+
+    def test_admin_tables_paginate_sort_and_filter(self):
+        with self.app.app_context():
+            for i in range(30):
+                db.session.add(Book(isbn=f'97800000002{i:02d}', title=f'Title {i:02d}', author='Author',
+                                    quantity=1, available_quantity=0 if i % 2 else 1))
+            db.session.commit()
+
+        page = self.client.get('/books').get_data(as_text=True)
+        self.assertIn('of 31 books', page)
+        self.assertIn('Title 00', page)
+        self.assertNotIn('Title 29', page)
+
+        page = self.client.get('/books?sort=-title&size=50').get_data(as_text=True)
+        self.assertLess(page.index('Title 29'), page.index('Title 00'))
+
+        page = self.client.get('/books?page=2').get_data(as_text=True)
+        self.assertIn('Title 29', page)
+        self.assertIn('Showing 26&ndash;31', page)
+
+        page = self.client.get('/books?status=unavailable').get_data(as_text=True)
+        self.assertIn('of 15 books', page)
+        self.assertNotIn('Title 00', page)
+
+        page = self.client.get('/students?q=jane').get_data(as_text=True)
+        self.assertIn('Jane Doe', page)
+        self.assertNotIn('admin@example.com', page)
+
+    def test_borrowings_status_filter_and_cached_count(self):
+        returned_id = self.add_borrowing()
+        self.return_borrowing(returned_id)
+        self.add_borrowing()
+
+        page = self.client.get('/borrowings?status=returned').get_data(as_text=True)
+        self.assertIn('of 1 borrowings', page)
+        with self.count_queries() as statements:
+            self.client.get('/borrowings?status=returned&page=1')
+        self.assertFalse([s for s in statements if 'count(' in s.lower()])
+
+        # A new borrowing invalidates the cached count
+        self.add_borrowing()
+        page = self.client.get('/borrowings').get_data(as_text=True)
+        self.assertIn('of 3 borrowings', page)
+
+if __name__ == '__main__':
+    unittest.main()